@@ -7,12 +7,65 @@ that bypasses the bimmer_connected library's problematic user agent.
 
 import aiohttp
 import asyncio
+import functools
+import logging
+import orjson
 import json
 import hashlib
 import uuid
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def generate_user_agent() -> str:
+    """
+    Generate a dynamic user agent that BMW won't block.
+    uuid.getnode() is stable for the process lifetime, so this runs once per process.
+    """
+    # Get stable system ID
+    system_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"bmw-{uuid.getnode()}"))
+    
+    # Create hash for build string
+    hash_obj = hashlib.sha256(system_id.encode())
+    hash_hex = hash_obj.hexdigest()
+    
+    # Generate Android-style build string
+    prefix = ''.join([
+        hash_hex[0].upper() if hash_hex[0].isalpha() else 'L',
+        hash_hex[1].upper() if hash_hex[1].isalpha() else 'P',
+        '1',
+        hash_hex[2].upper() if hash_hex[2].isalpha() else 'A'
+    ])
+    
+    middle_num = int(hash_hex[3:9], 16) % 1000000
+    end_num = int(hash_hex[9:12], 16) % 1000
+    
+    build_string = f"{prefix}.{middle_num:06d}.{end_num:03d}"
+    
+    # Return full user agent
+    user_agent = f"android({build_string});bmw;2.20.3;row"
+    logger.info("Generated user agent: %s", user_agent)
+    return user_agent
+
+
+# Static request parts, built once; per-request values are merged in
+_AUTH_HEADERS = {
+    'user-agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X)',
+    'content-type': 'application/json',
+    'accept': 'application/json'
+}
+_API_HEADERS = {'accept': 'application/json'}
+_AUTH_DATA_TEMPLATE = {
+    'client_id': 'dbf0a542-ebd1-4ff0-a9a7-55172fbfce35',  # BMW client ID
+    'response_type': 'token',
+    'redirect_uri': 'com.bmw.connected://oauth',
+    'scope': 'authenticate_user vehicle_data remote_services',
+}
+
+
 class BMWAuthFixed:
     """Fixed BMW authentication that handles user agent properly"""
     
@@ -28,31 +81,8 @@ class BMWAuthFixed:
         self.session = None
         
     def _generate_user_agent(self) -> str:
-        """Generate a dynamic user agent that BMW won't block"""
-        # Get stable system ID
-        system_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"bmw-{uuid.getnode()}"))
-        
-        # Create hash for build string
-        hash_obj = hashlib.sha256(system_id.encode())
-        hash_hex = hash_obj.hexdigest()
-        
-        # Generate Android-style build string
-        prefix = ''.join([
-            hash_hex[0].upper() if hash_hex[0].isalpha() else 'L',
-            hash_hex[1].upper() if hash_hex[1].isalpha() else 'P',
-            '1',
-            hash_hex[2].upper() if hash_hex[2].isalpha() else 'A'
-        ])
-        
-        middle_num = int(hash_hex[3:9], 16) % 1000000
-        end_num = int(hash_hex[9:12], 16) % 1000
-        
-        build_string = f"{prefix}.{middle_num:06d}.{end_num:03d}"
-        
-        # Return full user agent
-        user_agent = f"android({build_string});bmw;2.20.3;row"
-        print(f"Generated user agent: {user_agent}")
-        return user_agent
+        """User agent for this container (derived once per process, see generate_user_agent)"""
+        return generate_user_agent()
     
     async def authenticate_with_hcaptcha(self, email: str, password: str, hcaptcha_token: str) -> bool:
         """
@@ -65,21 +95,13 @@ class BMWAuthFixed:
             self.session = aiohttp.ClientSession()
         
         # Set our custom headers
-        headers = {
-            'x-user-agent': self._generate_user_agent(),
-            'user-agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X)',
-            'content-type': 'application/json',
-            'accept': 'application/json'
-        }
+        headers = {**_AUTH_HEADERS, 'x-user-agent': self._generate_user_agent()}
         
         # Prepare auth payload
         auth_data = {
+            **_AUTH_DATA_TEMPLATE,
             'username': email,
             'password': password,
-            'client_id': 'dbf0a542-ebd1-4ff0-a9a7-55172fbfce35',  # BMW client ID
-            'response_type': 'token',
-            'redirect_uri': 'com.bmw.connected://oauth',
-            'scope': 'authenticate_user vehicle_data remote_services',
             'hcaptcha_token': hcaptcha_token
         }
         
@@ -90,24 +112,24 @@ class BMWAuthFixed:
                 json=auth_data,
                 headers=headers
             ) as response:
-                print(f"Auth response status: {response.status}")
+                logger.info("Auth response status: %s", response.status)
                 
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=orjson.loads, content_type=None)
                     self.access_token = data.get('access_token')
                     self.refresh_token = data.get('refresh_token')
                     expires_in = data.get('expires_in', 3600)
                     self.token_expires = datetime.now() + timedelta(seconds=expires_in)
                     
-                    print("Authentication successful!")
+                    logger.info("Authentication successful")
                     return True
                 else:
                     error_text = await response.text()
-                    print(f"Authentication failed: {error_text}")
+                    logger.warning("Authentication failed: %s", error_text)
                     return False
                     
         except Exception as e:
-            print(f"Authentication error: {e}")
+            logger.error("Authentication error: %s", e)
             return False
     
     async def get_vehicles(self) -> list:
@@ -116,14 +138,14 @@ class BMWAuthFixed:
             raise Exception("Not authenticated")
         
         headers = {
+            **_API_HEADERS,
             'authorization': f'Bearer {self.access_token}',
-            'x-user-agent': self._generate_user_agent(),
-            'accept': 'application/json'
+            'x-user-agent': self._generate_user_agent()
         }
         
         async with self.session.get(self.VEHICLES_URL, headers=headers) as response:
             if response.status == 200:
-                return await response.json()
+                return await response.json(loads=orjson.loads, content_type=None)
             else:
                 raise Exception(f"Failed to get vehicles: {response.status}")
     
@@ -12,6 +12,9 @@ import json
 import hashlib
 import secrets
 import base64
+import platform
+import re
+import uuid
 from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from urllib.parse import urlencode, urlparse, parse_qs
@@ -114,10 +117,6 @@ class BMWFingerprintAuth:
     
     def _generate_fallback_fingerprint(self) -> str:
         """Generate fingerprint if extraction fails"""
-        import platform
-        import uuid
-        import re
-        
         # Get system UUID
         system = platform.system().lower()
         
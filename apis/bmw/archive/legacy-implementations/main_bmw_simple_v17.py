@@ -3,6 +3,7 @@ BMW API using bimmer_connected 0.17.3 with built-in fingerprint fix
 Clean implementation without manual patching needed
 """
 import os
+import re
 import json
 import asyncio
 from pathlib import Path
@@ -12,12 +13,28 @@ import functions_framework
 from bimmer_connected.account import MyBMWAccount
 from bimmer_connected.api.regions import Regions
 from bimmer_connected.cli import load_oauth_store_from_file, store_oauth_store_to_file
+from bimmer_connected.models import MyBMWAuthError, MyBMWQuotaError
 from bimmer_connected.vehicle.remote_services import RemoteServices
 
 # Configuration
 BUCKET_NAME = "bmw-api-bucket"
 LOCAL_TOKEN_FILE = "/tmp/bmw_oauth.json"
 
+# CORS headers (built once, shared by every response)
+_CORS_PREFLIGHT_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST, GET",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+_CORS_JSON_HEADERS = {"Access-Control-Allow-Origin": "*"}
+
+# Actions that send a remote command; BMW runs one per vehicle at a time
+_REMOTE_ACTIONS = frozenset({"lock", "unlock", "flash", "climate"})
+
+# Fallback error classification for exceptions not raised as bimmer_connected types
+_ERR_401_RE = re.compile(r"unauthorized|401", re.IGNORECASE)
+_ERR_429_RE = re.compile(r"429|quota", re.IGNORECASE)
+
 def get_oauth_filename(email):
     """Get user-specific OAuth filename"""
     safe_email = email.replace('@', '_at_').replace('.', '_')
@@ -50,6 +67,91 @@ def upload_oauth_file(email):
     except Exception as e:
         print(f"⚠️ Could not upload OAuth token: {e}")
 
+async def _dispatch(remote_services, vehicle, action):
+    """Execute a single action against an already-fetched vehicle"""
+    if action == "status":
+        # Get comprehensive status
+        return {
+            "doors_locked": vehicle.doors_windows.lock_state.value if hasattr(vehicle, "doors_windows") else None,
+            "mileage": {
+                "value": vehicle.mileage.value if hasattr(vehicle.mileage, "value") else vehicle.mileage,
+                "unit": vehicle.mileage.unit if hasattr(vehicle.mileage, "unit") else "km"
+            },
+            "fuel": {
+                "remaining_percent": vehicle.fuel_and_battery.remaining_fuel_percent if hasattr(vehicle, "fuel_and_battery") else None,
+                "remaining_range": vehicle.fuel_and_battery.remaining_range_total if hasattr(vehicle, "fuel_and_battery") else None
+            },
+            "location": {
+                "latitude": vehicle.location.location.latitude if hasattr(vehicle, "location") and vehicle.location and vehicle.location.location else None,
+                "longitude": vehicle.location.location.longitude if hasattr(vehicle, "location") and vehicle.location and vehicle.location.location else None
+            }
+        }
+        
+    elif action == "lock":
+        print("🔒 Sending lock command...")
+        await remote_services.trigger_remote_door_lock()
+        return {
+            "command": "lock",
+            "status": "initiated",
+            "message": "Lock command sent successfully"
+        }
+        
+    elif action == "unlock":
+        print("🔓 Sending unlock command...")
+        await remote_services.trigger_remote_door_unlock()
+        return {
+            "command": "unlock",
+            "status": "initiated",
+            "message": "Unlock command sent successfully"
+        }
+        
+    elif action == "flash":
+        print("💡 Sending flash lights command...")
+        await remote_services.trigger_remote_light_flash()
+        return {
+            "command": "flash",
+            "status": "initiated",
+            "message": "Flash lights command sent successfully"
+        }
+        
+    elif action == "climate":
+        print("❄️ Sending climate control command...")
+        await remote_services.trigger_remote_air_conditioning()
+        return {
+            "command": "climate",
+            "status": "initiated",
+            "message": "Climate control command sent successfully"
+        }
+        
+    elif action == "location":
+        location = vehicle.location
+        if location and location.location:
+            return {
+                "latitude": location.location.latitude,
+                "longitude": location.location.longitude,
+                "heading": location.heading,
+                "timestamp": location.vehicle_update_timestamp.isoformat() if location.vehicle_update_timestamp else None
+            }
+        return {"error": "Location not available"}
+            
+    elif action == "fuel":
+        fuel = vehicle.fuel_and_battery
+        if fuel:
+            return {
+                "remaining_fuel": fuel.remaining_fuel,
+                "remaining_fuel_percent": fuel.remaining_fuel_percent,
+                "remaining_range_fuel": fuel.remaining_range_fuel,
+                "remaining_range_electric": fuel.remaining_range_electric,
+                "remaining_range_total": fuel.remaining_range_total
+            }
+        return {"error": "Fuel data not available"}
+            
+    return {"error": f"Unknown action: {action}"}
+
+async def _dispatch_all(remote_services, vehicle, actions):
+    """Run all requested actions concurrently on the shared loop/session"""
+    return await asyncio.gather(*[_dispatch(remote_services, vehicle, a) for a in actions])
+
 @functions_framework.http
 def bmw_api(request):
     """
@@ -57,12 +159,7 @@ def bmw_api(request):
     """
     # Handle CORS
     if request.method == "OPTIONS":
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, GET",
-            "Access-Control-Allow-Headers": "Content-Type",
-        }
-        return ("", 204, headers)
+        return ("", 204, _CORS_PREFLIGHT_HEADERS)
     
     # Health check endpoint
     if request.method == "GET" and request.path == "/health":
@@ -75,7 +172,7 @@ def bmw_api(request):
                 "fingerprint": "built-in PR #743",
                 "quota_fix": "enabled"
             }
-        }), 200, {"Access-Control-Allow-Origin": "*"}
+        }), 200, _CORS_JSON_HEADERS
     
     # Parse request
     try:
@@ -99,9 +196,25 @@ def bmw_api(request):
     
     # Optional fields
     action = data.get("action", "status")
+    batch = data.get("actions")
+    # Results are keyed by action name, so a batch must be a list of distinct strings
+    if batch is not None and (
+        not isinstance(batch, list)
+        or not all(isinstance(name, str) for name in batch)
+        or len(set(batch)) != len(batch)
+    ):
+        return jsonify({"error": "Invalid request: 'actions' must be a list of unique action names"}), 400, _CORS_JSON_HEADERS
+    actions = batch or [action]
+    # Batch actions run concurrently, so at most one of them may be a remote command
+    remote = [name for name in actions if name in _REMOTE_ACTIONS]
+    if len(remote) > 1:
+        return jsonify({
+            "error": "Only one remote service action is allowed per request",
+            "remote_actions": remote
+        }), 400, _CORS_JSON_HEADERS
     hcaptcha_token = data.get("hcaptcha")
     
-    print(f"📋 Processing BMW API request: action={action}, vehicle={wkn}")
+    print(f"📋 Processing BMW API request: actions={actions}, vehicle={wkn}")
     
     try:
         # Check for existing OAuth token
@@ -126,6 +239,10 @@ def bmw_api(request):
         print("🚗 Fetching vehicles...")
         asyncio.run(account.get_vehicles())
         
+        # Store updated OAuth token (also on 404, so a retry with the right wkn skips re-auth)
+        store_oauth_store_to_file(Path(LOCAL_TOKEN_FILE), account)
+        upload_oauth_file(email)
+        
         # Find target vehicle
         vehicle = account.get_vehicle(wkn)
         if not vehicle:
@@ -134,10 +251,6 @@ def bmw_api(request):
                 "available_vehicles": [v.vin for v in account.vehicles]
             }), 404
         
-        # Store updated OAuth token
-        store_oauth_store_to_file(Path(LOCAL_TOKEN_FILE), account)
-        upload_oauth_file(email)
-        
         # Build base response
         response = {
             "success": True,
@@ -147,111 +260,32 @@ def bmw_api(request):
                 "vin": vehicle.vin,
                 "model": getattr(vehicle, "model", "Unknown")
             },
-            "action": action
+            "action": actions if batch else action
         }
         
-        # Process actions
-        if action == "status":
-            # Get comprehensive status
-            response["result"] = {
-                "doors_locked": vehicle.doors_windows.lock_state.value if hasattr(vehicle, "doors_windows") else None,
-                "mileage": {
-                    "value": vehicle.mileage.value if hasattr(vehicle.mileage, "value") else vehicle.mileage,
-                    "unit": vehicle.mileage.unit if hasattr(vehicle.mileage, "unit") else "km"
-                },
-                "fuel": {
-                    "remaining_percent": vehicle.fuel_and_battery.remaining_fuel_percent if hasattr(vehicle, "fuel_and_battery") else None,
-                    "remaining_range": vehicle.fuel_and_battery.remaining_range_total if hasattr(vehicle, "fuel_and_battery") else None
-                },
-                "location": {
-                    "latitude": vehicle.location.location.latitude if hasattr(vehicle, "location") and vehicle.location and vehicle.location.location else None,
-                    "longitude": vehicle.location.location.longitude if hasattr(vehicle, "location") and vehicle.location and vehicle.location.location else None
-                }
-            }
-            
-        elif action == "lock":
-            print("🔒 Sending lock command...")
-            remote_services = RemoteServices(vehicle)
-            result = asyncio.run(remote_services.trigger_remote_door_lock())
-            response["result"] = {
-                "command": "lock",
-                "status": "initiated",
-                "message": "Lock command sent successfully"
-            }
-            
-        elif action == "unlock":
-            print("🔓 Sending unlock command...")
-            remote_services = RemoteServices(vehicle)
-            result = asyncio.run(remote_services.trigger_remote_door_unlock())
-            response["result"] = {
-                "command": "unlock",
-                "status": "initiated",
-                "message": "Unlock command sent successfully"
-            }
-            
-        elif action == "flash":
-            print("💡 Sending flash lights command...")
-            remote_services = RemoteServices(vehicle)
-            result = asyncio.run(remote_services.trigger_remote_light_flash())
-            response["result"] = {
-                "command": "flash",
-                "status": "initiated",
-                "message": "Flash lights command sent successfully"
-            }
-            
-        elif action == "climate":
-            print("❄️ Sending climate control command...")
-            remote_services = RemoteServices(vehicle)
-            result = asyncio.run(remote_services.trigger_remote_air_conditioning())
-            response["result"] = {
-                "command": "climate",
-                "status": "initiated",
-                "message": "Climate control command sent successfully"
-            }
-            
-        elif action == "location":
-            location = vehicle.location
-            if location and location.location:
-                response["result"] = {
-                    "latitude": location.location.latitude,
-                    "longitude": location.location.longitude,
-                    "heading": location.heading,
-                    "timestamp": location.vehicle_update_timestamp.isoformat() if location.vehicle_update_timestamp else None
-                }
-            else:
-                response["result"] = {"error": "Location not available"}
-                
-        elif action == "fuel":
-            fuel = vehicle.fuel_and_battery
-            if fuel:
-                response["result"] = {
-                    "remaining_fuel": fuel.remaining_fuel,
-                    "remaining_fuel_percent": fuel.remaining_fuel_percent,
-                    "remaining_range_fuel": fuel.remaining_range_fuel,
-                    "remaining_range_electric": fuel.remaining_range_electric,
-                    "remaining_range_total": fuel.remaining_range_total
-                }
-            else:
-                response["result"] = {"error": "Fuel data not available"}
-                
+        # Process actions (a batch shares the single auth + get_vehicles round-trip)
+        remote_services = RemoteServices(vehicle)
+        results = asyncio.run(_dispatch_all(remote_services, vehicle, actions))
+        if batch:
+            response["results"] = dict(zip(actions, results))
         else:
-            response["result"] = {"error": f"Unknown action: {action}"}
+            response["result"] = results[0]
         
         # Return successful response
-        return jsonify(response), 200, {"Access-Control-Allow-Origin": "*"}
+        return jsonify(response), 200, _CORS_JSON_HEADERS
         
     except Exception as e:
         error_msg = str(e)
         print(f"❌ Error: {error_msg}")
         
         # Determine error type and response
-        if "unauthorized" in error_msg.lower() or "401" in error_msg:
+        if isinstance(e, MyBMWAuthError) or _ERR_401_RE.search(error_msg):
             return jsonify({
                 "error": "Authentication failed",
                 "message": "Invalid credentials or expired token",
                 "hint": "Check email/password or provide hCaptcha token"
             }), 401
-        elif "429" in error_msg or "quota" in error_msg.lower():
+        elif isinstance(e, MyBMWQuotaError) or _ERR_429_RE.search(error_msg):
             return jsonify({
                 "error": "Rate limited",
                 "message": "BMW API quota exceeded",
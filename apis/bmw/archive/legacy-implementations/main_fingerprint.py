@@ -22,6 +22,12 @@ from urllib.parse import urlencode, urlparse, parse_qs
 from google.cloud import storage
 from google.cloud import secretmanager
 
+# uvloop is optional; when present asyncio.run() uses a libuv-backed loop
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
 
 def get_system_uuid() -> str:
     """
@@ -122,6 +128,15 @@ class BMWAPIFingerprint:
     REDIRECT_URI = "com.bmw.connected://oauth"
     SCOPE = "openid profile email offline_access smacc vehicle_data perseus dlm svds cesim vsapi remote_services fupo authenticate_user"
     
+    # Remote service action -> BMW service code
+    SERVICE_MAP = {
+        'lock': 'RDL',
+        'unlock': 'RDU',
+        'climate': 'RCN',
+        'horn': 'RHB',
+        'lights': 'RLF'
+    }
+    
     def __init__(self):
         self.session = None
         self.fingerprint = generate_bmw_fingerprint()
@@ -313,15 +328,7 @@ class BMWAPIFingerprint:
         headers = self._get_headers(authenticated=True)
         headers['content-type'] = 'application/json'
         
-        service_map = {
-            'lock': 'RDL',
-            'unlock': 'RDU',
-            'climate': 'RCN',
-            'horn': 'RHB',
-            'lights': 'RLF'
-        }
-        
-        service_code = service_map.get(service.lower())
+        service_code = self.SERVICE_MAP.get(service.lower())
         if not service_code:
             print(f"❌ Unknown service: {service}")
             return False
@@ -333,7 +340,7 @@ class BMWAPIFingerprint:
                 json={}
             ) as response:
                 
-                if response.status == 200:
+                if 200 <= response.status < 300:
                     print(f"✅ Service {service} executed successfully")
                     return True
                 else:
@@ -402,10 +409,7 @@ def bmw_api_fingerprint(request):
     print(f"🚗 Processing BMW API request...")
     print(f"📋 Action: {action}")
     
-    # Run async operations
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
+    # Run async operations in a single top-level coroutine
     try:
         async def process_request():
             async with BMWAPIFingerprint() as api:
@@ -423,16 +427,14 @@ def bmw_api_fingerprint(request):
                     vehicles = await api.get_vehicles()
                     
                     if wkn:
-                        # Find specific vehicle
-                        target_vehicle = None
-                        for vehicle in vehicles:
-                            if vehicle.get('vin') == wkn:
-                                target_vehicle = vehicle
-                                break
+                        # Find specific vehicle (one pass builds the VIN index)
+                        by_vin = {vehicle.get('vin'): vehicle for vehicle in vehicles}
+                        target_vehicle = by_vin.get(wkn)
                         
                         if not target_vehicle:
                             return {
-                                "error": f"Vehicle {wkn} not found"
+                                "error": f"Vehicle {wkn} not found",
+                                "available_vehicles": list(by_vin)
                             }, 404
                         
                         return {
@@ -473,7 +475,7 @@ def bmw_api_fingerprint(request):
                         "available_actions": ["status", "lock", "unlock", "climate", "horn", "lights"]
                     }, 400
         
-        result, status_code = loop.run_until_complete(process_request())
+        result, status_code = asyncio.run(process_request())
         
         # Add CORS headers to response
         response = jsonify(result)
@@ -490,9 +492,6 @@ def bmw_api_fingerprint(request):
             "error": "Internal server error",
             "details": str(e)
         }), 500
-    
-    finally:
-        loop.close()
 
 
 if __name__ == "__main__":
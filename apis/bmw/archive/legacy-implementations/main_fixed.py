@@ -8,78 +8,145 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from fingerprint_patch import apply_fingerprint_patch
 apply_fingerprint_patch()
 
+import functions_framework
+import logging
+from flask import jsonify, Response
+import asyncio
+import aiohttp
+import concurrent.futures
+import orjson
+import functools
+import hashlib
+import secrets
+import base64
+import platform
+import uuid
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Optional
+from datetime import datetime
+from urllib.parse import urlencode, urlparse, parse_qs
 
-def get_system_uuid() -> str:
+# Configure logging; LOG_LEVEL=DEBUG enables the fingerprint and auth diagnostics
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+# CORS headers (built once, shared by every response)
+_CORS_PREFLIGHT_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST, GET",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+_CORS_JSON_HEADERS = {"Access-Control-Allow-Origin": "*"}
+_PREFLIGHT_RESPONSE = ("", 204, _CORS_PREFLIGHT_HEADERS)
+
+# Background event loop shared by all requests; handler threads submit
+# coroutines to it, so the HTTP session and its keep-alive pool persist
+_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_LOOP.run_forever, name="bmw-api-loop", daemon=True).start()
+
+# Upper bound for one request's coroutine, so a stuck upstream cannot hold a handler thread
+REQUEST_TIMEOUT = 120  # seconds
+
+# Shared HTTP session, created lazily inside _LOOP and never closed per request.
+# It serves every user's login, so it keeps no cookies: the OAuth flow passes the
+# code and tokens explicitly, and one account's cookies must never reach another's.
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Return the shared session, creating it on first use"""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=75),
+            cookie_jar=aiohttp.DummyCookieJar()
+        )
+    return _SESSION
+
+
+def _probe_system_uuid() -> str:
     """
-    Get stable system UUID for Cloud Run container
-    This ensures consistent fingerprint across container lifecycle
+    Probe a stable system UUID for the Cloud Run container
+    Runs once at import: none of the inputs change during the container lifecycle
     """
     # For Cloud Run, use service and revision info for stability
     service_name = os.environ.get('K_SERVICE', 'bmw-api-fingerprint')
+    
+    # Try machine-id first, combined with service info for uniqueness
+    if platform.system().lower() == 'linux':
+        try:
+            machine_id = Path('/etc/machine-id').read_text().strip()
+            if machine_id:
+                return f"{machine_id}-{service_name}"
+        except OSError:
+            pass
+    
+    # Fallback to MAC address
+    mac_address = uuid.getnode()
+    if mac_address:
+        return f"{mac_address}-{service_name}"
+    
+    # Final fallback: stable identifier for this Cloud Run instance
     revision = os.environ.get('K_REVISION', 'default')
     region = os.environ.get('FUNCTION_REGION', 'europe-west6')
-    
-    # Try to get container ID for additional uniqueness
     container_id = 'default'
     try:
-        with open('/proc/self/cgroup', 'r') as f:
-            for line in f:
-                if 'docker' in line or 'containerd' in line:
-                    container_id = line.split('/')[-1].strip()[:12]
-                    break
-    except:
+        for line in Path('/proc/self/cgroup').read_text().splitlines():
+            if 'docker' in line or 'containerd' in line:
+                container_id = line.split('/')[-1].strip()[:12]
+                break
+    except OSError:
         pass
-    
-    # Create stable identifier for this Cloud Run instance
-    stable_id = f"{service_name}-{revision}-{region}-{container_id}"
-    
-    # Also try to get actual system UUID as fallback
-    try:
-        system = platform.system().lower()
-        if system == 'linux':
-            # Try machine-id first
-            try:
-                with open('/etc/machine-id', 'r') as f:
-                    machine_id = f.read().strip()
-                if machine_id:
-                    # Combine with service info for uniqueness
-                    return f"{machine_id}-{service_name}"
-            except:
-                pass
-                
-        # Fallback to MAC address
-        mac_address = uuid.getnode()
-        if mac_address:
-            return f"{mac_address}-{service_name}"
-            
-    except:
-        pass
-        
-    # Final fallback: use our stable Cloud Run ID
-    return stable_id
+    return f"{service_name}-{revision}-{region}-{container_id}"
+
+
+_SYSTEM_UUID = _probe_system_uuid()
 
 
+def get_system_uuid() -> str:
+    """
+    Get stable system UUID for Cloud Run container
+    This ensures consistent fingerprint across container lifecycle
+    """
+    return _SYSTEM_UUID
+
+
+@functools.lru_cache(maxsize=1)
 def generate_bmw_fingerprint() -> str:
     """
     Generate BMW-compatible fingerprint based on PR #743
+    Computed once per container; later calls (per request, /health) hit the cache
     """
-    # Get stable system UUID
-    system_uuid = get_system_uuid()
-    print(f"🔧 System UUID: {system_uuid}")
+    # Get stable system UUID (probed once at import)
+    system_uuid = _SYSTEM_UUID
+    logger.debug("System UUID: %s", system_uuid)
     
     # Use SHA1 (BMW standard, not SHA256)
-    digest = hashlib.sha1(system_uuid.encode()).hexdigest().upper()
-    print(f"🔧 SHA1 digest: {digest}")
+    raw = hashlib.sha1(system_uuid.encode()).digest()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("SHA1 digest: %s", raw.hex().upper())
     
-    # Extract numeric digits from hash
-    numeric_chars = re.findall(r'\d', digest)
-    if len(numeric_chars) < 9:
+    # Extract numeric digits straight from the digest nibbles (same order as the hex string)
+    digits = []
+    for b in raw:
+        hi, lo = b >> 4, b & 0xF
+        if hi < 10:
+            digits.append(hi)
+        if lo < 10:
+            digits.append(lo)
+        if len(digits) >= 9:
+            break
+    if len(digits) < 9:
         # Pad with zeros if not enough digits
-        numeric_chars.extend(['0'] * (9 - len(numeric_chars)))
+        digits.extend([0] * (9 - len(digits)))
     
     # Create build string components
-    middle_part = ''.join(numeric_chars[:6])
-    build_part = ''.join(numeric_chars[6:9])
+    middle_part = ''.join(map(str, digits[:6]))
+    build_part = ''.join(map(str, digits[6:9]))
     
     # Platform prefix (Linux for Cloud Run)
     prefix = 'LP1A'  # Linux Platform 1A
@@ -87,10 +154,20 @@ def generate_bmw_fingerprint() -> str:
     # Final fingerprint format
     fingerprint = f"android({prefix}.{middle_part}.{build_part});bmw;2.20.3;row"
     
-    print(f"✅ Generated fingerprint: {fingerprint}")
+    logger.info("Generated fingerprint: %s", fingerprint)
     return fingerprint
 
 
+# Remote service name -> BMW service code (read-only, shared by all requests)
+_SERVICE_MAP = MappingProxyType({
+    'lock': 'RDL',
+    'unlock': 'RDU',
+    'climate': 'RCN',
+    'horn': 'RHB',
+    'lights': 'RLF'
+})
+
+
 class BMWAPIFingerprint:
     """BMW API with dynamic fingerprint generation"""
     
@@ -108,32 +185,47 @@ class BMWAPIFingerprint:
     REDIRECT_URI = "com.bmw.connected://oauth"
     SCOPE = "openid profile email offline_access smacc vehicle_data perseus dlm svds cesim vsapi remote_services fupo authenticate_user"
     
+    # Constant part of the /authenticate form body, encoded once per process
+    _AUTH_FORM_PREFIX = urlencode({
+        'client_id': CLIENT_ID,
+        'response_type': 'code',
+        'redirect_uri': REDIRECT_URI,
+        'scope': SCOPE,
+        'code_challenge_method': 'S256'
+    }).encode()
+    
     def __init__(self):
         self.session = None
         self.fingerprint = generate_bmw_fingerprint()
         self.access_token = None
         self.refresh_token = None
-        self.token_expires = None
+        self.token_deadline = 0.0  # time.monotonic() deadline for access_token
+        # Static part of every request's headers; _get_headers copies it
+        self._base_headers = MappingProxyType({
+            'x-user-agent': self.fingerprint,  # Dynamic fingerprint
+            'user-agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X)',
+            'accept': 'application/json',
+            'accept-language': 'en-US,en;q=0.9',
+            'x-identity-provider': 'gcdm',
+            '24-hour-format': 'true'
+        })
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self.session = await _get_session()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        # The shared session outlives this instance
+        self.session = None
+    
+    def _token_valid(self) -> bool:
+        """Check that an access token is held and not yet expired"""
+        return bool(self.access_token) and time.monotonic() < self.token_deadline
     
     def _get_headers(self, authenticated: bool = False) -> Dict[str, str]:
         """Get headers with dynamic fingerprint"""
-        headers = {
-            'x-user-agent': self.fingerprint,  # Dynamic fingerprint
-            'user-agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X)',
-            'accept': 'application/json',
-            'accept-language': 'en-US,en;q=0.9',
-            'x-identity-provider': 'gcdm',
-            'x-correlation-id': str(uuid.uuid4()),
-            '24-hour-format': 'true'
-        }
+        headers = dict(self._base_headers)
+        headers['x-correlation-id'] = uuid.uuid4().hex
         
         if authenticated and self.access_token:
             headers['authorization'] = f'Bearer {self.access_token}'
@@ -142,36 +234,24 @@ class BMWAPIFingerprint:
     
     async def authenticate(self, email: str, password: str, hcaptcha_token: Optional[str] = None) -> bool:
         """Authenticate with BMW using dynamic fingerprint"""
-        print(f"\n🔐 Authenticating with BMW API...")
-        print(f"📧 Email: {email}")
-        print(f"🔑 Using fingerprint: {self.fingerprint}")
+        logger.info("Authenticating with BMW API")
+        logger.debug("Email: %s", email)
+        logger.debug("Using fingerprint: %s", self.fingerprint)
         
-        # Generate PKCE challenge
-        code_verifier = base64.urlsafe_b64encode(
-            secrets.token_bytes(32)
-        ).decode('utf-8').rstrip('=')
+        # Generate PKCE challenge (verifier stays bytes until the token request)
+        verifier_bytes = base64.urlsafe_b64encode(secrets.token_bytes(32)).rstrip(b'=')
         
         code_challenge = base64.urlsafe_b64encode(
-            hashlib.sha256(code_verifier.encode()).digest()
-        ).decode('utf-8').rstrip('=')
-        
-        # OAuth parameters
-        oauth_params = {
-            'client_id': self.CLIENT_ID,
-            'response_type': 'code',
-            'redirect_uri': self.REDIRECT_URI,
-            'state': secrets.token_urlsafe(16),
-            'scope': self.SCOPE,
-            'code_challenge': code_challenge,
-            'code_challenge_method': 'S256'
-        }
+            hashlib.sha256(verifier_bytes).digest()
+        ).rstrip(b'=').decode()
         
         headers = self._get_headers()
         headers['content-type'] = 'application/x-www-form-urlencoded'
         
-        # Authenticate
+        # Authenticate: append only the per-request fields to the pre-encoded OAuth parameters
         auth_data = {
-            **oauth_params,
+            'state': secrets.token_urlsafe(16),
+            'code_challenge': code_challenge,
             'username': email,
             'password': password
         }
@@ -179,16 +259,18 @@ class BMWAPIFingerprint:
         if hcaptcha_token:
             auth_data['hcaptcha_token'] = hcaptcha_token
         
+        auth_body = self._AUTH_FORM_PREFIX + b'&' + urlencode(auth_data).encode()
+        
         try:
             async with self.session.post(
                 f"{self.OAUTH_BASE}/authenticate",
-                data=urlencode(auth_data),
+                data=auth_body,
                 headers=headers,
                 allow_redirects=False,
                 ssl=True
             ) as response:
                 
-                print(f"📡 Auth response status: {response.status}")
+                logger.debug("Auth response status: %s", response.status)
                 
                 if response.status == 302:
                     # Extract authorization code
@@ -203,7 +285,7 @@ class BMWAPIFingerprint:
                     
                     if 'code' in params:
                         auth_code = params['code'][0]
-                        print("✅ Got authorization code")
+                        logger.debug("Got authorization code")
                         
                         # Exchange for tokens
                         token_data = {
@@ -211,7 +293,7 @@ class BMWAPIFingerprint:
                             'code': auth_code,
                             'redirect_uri': self.REDIRECT_URI,
                             'client_id': self.CLIENT_ID,
-                            'code_verifier': code_verifier
+                            'code_verifier': verifier_bytes.decode()
                         }
                         
                         async with self.session.post(
@@ -221,52 +303,52 @@ class BMWAPIFingerprint:
                         ) as token_response:
                             
                             if token_response.status == 200:
-                                tokens = await token_response.json()
+                                tokens = orjson.loads(await token_response.read())
                                 self.access_token = tokens.get('access_token')
                                 self.refresh_token = tokens.get('refresh_token')
                                 expires_in = tokens.get('expires_in', 3600)
-                                self.token_expires = datetime.now() + timedelta(seconds=expires_in)
+                                self.token_deadline = time.monotonic() + expires_in
                                 
-                                print("✅ Authentication successful!")
+                                logger.info("Authentication successful")
                                 return True
                             else:
                                 error_text = await token_response.text()
-                                print(f"❌ Token exchange failed: {error_text}")
+                                logger.error("Token exchange failed: %s", error_text)
                                 return False
                     else:
-                        print(f"❌ No code in redirect")
+                        logger.error("No code in redirect")
                         return False
                         
                 elif response.status == 200:
                     # Direct token response
-                    data = await response.json()
+                    data = orjson.loads(await response.read())
                     if 'access_token' in data:
                         self.access_token = data['access_token']
                         self.refresh_token = data.get('refresh_token')
                         expires_in = data.get('expires_in', 3600)
-                        self.token_expires = datetime.now() + timedelta(seconds=expires_in)
-                        print("✅ Got tokens directly!")
+                        self.token_deadline = time.monotonic() + expires_in
+                        logger.info("Got tokens directly")
                         return True
                     else:
-                        print(f"❌ Unexpected response")
+                        logger.error("Unexpected response")
                         return False
                         
                 elif response.status == 429:
-                    print("❌ Rate limited - but this should be less likely with unique fingerprint")
+                    logger.warning("Rate limited - but this should be less likely with unique fingerprint")
                     return False
                     
                 else:
                     error_text = await response.text()
-                    print(f"❌ Authentication failed: {error_text}")
+                    logger.error("Authentication failed: %s", error_text)
                     return False
                     
         except Exception as e:
-            print(f"❌ Error during authentication: {e}")
+            logger.error("Error during authentication: %s", e)
             return False
     
     async def get_vehicles(self) -> list:
         """Get list of vehicles"""
-        if not self.access_token:
+        if not self._token_valid():
             return []
         
         headers = self._get_headers(authenticated=True)
@@ -278,60 +360,82 @@ class BMWAPIFingerprint:
             ) as response:
                 
                 if response.status == 200:
-                    data = await response.json()
+                    data = orjson.loads(await response.read())
                     vehicles = data.get('vehicles', [])
-                    print(f"✅ Found {len(vehicles)} vehicles")
+                    logger.info("Found %d vehicles", len(vehicles))
                     return vehicles
                 else:
                     error_text = await response.text()
-                    print(f"❌ Failed to get vehicles: {error_text}")
+                    logger.error("Failed to get vehicles: %s", error_text)
                     return []
                     
         except Exception as e:
-            print(f"❌ Error getting vehicles: {e}")
+            logger.error("Error getting vehicles: %s", e)
             return []
     
     async def execute_remote_service(self, vin: str, service: str) -> bool:
         """Execute remote service (lock, unlock, etc.)"""
-        if not self.access_token:
+        if not self._token_valid():
             return False
         
         headers = self._get_headers(authenticated=True)
         headers['content-type'] = 'application/json'
         
-        service_map = {
-            'lock': 'RDL',
-            'unlock': 'RDU',
-            'climate': 'RCN',
-            'horn': 'RHB',
-            'lights': 'RLF'
-        }
-        
-        service_code = service_map.get(service.lower())
+        service = service.casefold()
+        service_code = _SERVICE_MAP.get(service)
         if not service_code:
-            print(f"❌ Unknown service: {service}")
+            logger.error("Unknown service: %s", service)
             return False
         
         try:
             async with self.session.post(
                 f"{self.REMOTE_SERVICES_URL}/{vin}/{service_code}",
                 headers=headers,
-                json={}
+                data=b'{}'
             ) as response:
                 
-                if response.status == 200:
-                    print(f"✅ Service {service} executed successfully")
+                if 200 <= response.status < 300:
+                    logger.info("Service %s executed successfully", service)
                     return True
                 else:
                     error_text = await response.text()
-                    print(f"❌ Service execution failed: {error_text}")
+                    logger.error("Service execution failed: %s", error_text)
                     return False
                     
         except Exception as e:
-            print(f"❌ Error executing service: {e}")
+            logger.error("Error executing service: %s", e)
             return False
 
 
+async def _warm_session() -> None:
+    """
+    Open a pooled TLS connection to the BMW host ahead of the first request
+    OAuth, token exchange and vehicle calls all hit this host, so they start on a warm connection
+    """
+    try:
+        session = await _get_session()
+        async with session.head(BMWAPIFingerprint.BASE_URL, allow_redirects=False) as response:
+            await response.release()
+    except Exception as e:
+        logger.debug("Connection warm-up failed: %s", e)
+
+
+# On Cloud Functions (K_SERVICE is set), warm the pool in the background while the
+# container finishes starting; local imports and tooling make no network call
+if os.environ.get("K_SERVICE"):
+    asyncio.run_coroutine_threadsafe(_warm_session(), _LOOP)
+
+
+# Static /health fields, built once (the fingerprint is fixed per container)
+_HEALTH_DATA = {
+    "status": "healthy",
+    "service": "bmw-api-fingerprint",
+    "version": "1.0.0",
+    "fingerprint": generate_bmw_fingerprint(),
+    "implementation": "PR #743 dynamic generation"
+}
+
+
 @functions_framework.http
 def bmw_api_fixed(request):
     """
@@ -340,24 +444,14 @@ def bmw_api_fixed(request):
     
     # Handle CORS
     if request.method == "OPTIONS":
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, GET",
-            "Access-Control-Allow-Headers": "Content-Type",
-        }
-        return ("", 204, headers)
+        return _PREFLIGHT_RESPONSE
     
     # Health check endpoint
     if request.path == "/health":
-        fingerprint = generate_bmw_fingerprint()
-        return jsonify({
-            "status": "healthy",
-            "service": "bmw-api-fingerprint",
-            "version": "1.0.0",
-            "fingerprint": fingerprint,
-            "implementation": "PR #743 dynamic generation",
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        return Response(
+            orjson.dumps({**_HEALTH_DATA, "timestamp": datetime.utcnow().isoformat()}),
+            mimetype='application/json'
+        )
     
     # Parse request
     try:
@@ -385,12 +479,7 @@ def bmw_api_fixed(request):
     wkn = data.get("wkn", "")
     hcaptcha_token = data.get("hcaptcha")
     
-    print(f"🚗 Processing BMW API request...")
-    print(f"📋 Action: {action}")
-    
-    # Run async operations
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    logger.info("Processing BMW API request, action: %s", action)
     
     try:
         async def process_request():
@@ -410,13 +499,9 @@ def bmw_api_fixed(request):
                     
                     if wkn:
                         # Find specific vehicle
-                        target_vehicle = None
-                        for vehicle in vehicles:
-                            if vehicle.get('vin') == wkn:
-                                target_vehicle = vehicle
-                                break
+                        target_vehicle = next((v for v in vehicles if v.get('vin') == wkn), None)
                         
-                        if not target_vehicle:
+                        if target_vehicle is None:
                             return {
                                 "error": f"Vehicle {wkn} not found"
                             }, 404
@@ -459,26 +544,28 @@ def bmw_api_fixed(request):
                         "available_actions": ["status", "lock", "unlock", "climate", "horn", "lights"]
                     }, 400
         
-        result, status_code = loop.run_until_complete(process_request())
+        # Run async operations on the shared background loop
+        future = asyncio.run_coroutine_threadsafe(process_request(), _LOOP)
+        try:
+            result, status_code = future.result(timeout=REQUEST_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logger.error("Request timed out after %d seconds", REQUEST_TIMEOUT)
+            result, status_code = {
+                "error": "BMW servers took too long to respond",
+                "timeout": f"{REQUEST_TIMEOUT} seconds"
+            }, 504
         
         # Add CORS headers to response
-        response = jsonify(result)
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        
-        return response, status_code
+        return Response(orjson.dumps(result), status=status_code, mimetype='application/json', headers=_CORS_JSON_HEADERS)
         
     except Exception as e:
-        print(f"❌ Error processing request: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error processing request: %s", e)
         
         return jsonify({
             "error": "Internal server error",
             "details": str(e)
         }), 500
-    
-    finally:
-        loop.close()
 
 
 if __name__ == "__main__":
@@ -8,54 +8,221 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from fingerprint_patch import apply_fingerprint_patch
 apply_fingerprint_patch()
 
-import json
+import time
 import asyncio
-from pathlib import Path
+import orjson
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
 from flask import request, jsonify
 import functions_framework
 from bimmer_connected.account import MyBMWAccount
 from bimmer_connected.api.regions import Regions
-from bimmer_connected.cli import load_oauth_store_from_file, store_oauth_store_to_file
 from bimmer_connected.vehicle.remote_services import RemoteServices, Services
 
 # 🔹 Configuration for GCS Bucket & OAuth Token File Details
 BUCKET_NAME = "bmw-api-bucket"
 OAUTH_FILENAME = "bmw_oauth.json"
-LOCAL_TOKEN_FILE = "/tmp/bmw_oauth.json"
+# session_id is dropped after 14 days so BMW issues a fresh one (same rule as bimmer_connected's CLI)
+SESSION_ID_MAX_AGE = 14 * 24 * 60 * 60
+
+# 🔹 CORS headers (built once, shared by every response)
+_CORS_PREFLIGHT_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+_CORS_JSON_HEADERS = {"Access-Control-Allow-Origin": "*"}
+_PREFLIGHT_RESPONSE = ("", 204, _CORS_PREFLIGHT_HEADERS)
 
 # 🔹 Utility Functions for OAuth Token Management
 
-def download_oauth_file():
+# GCS client and bucket handle, created on first use and reused by warm instances
+_GCS_CLIENT = None
+_BUCKET = None
+
+def _bucket():
+    """
+    Return the cached GCS bucket handle, creating the storage client once.
+    Client construction does credential discovery, so it must not run per call.
+    """
+    global _GCS_CLIENT, _BUCKET
+    if _BUCKET is None:
+        _GCS_CLIENT = storage.Client()
+        _BUCKET = _GCS_CLIENT.bucket(BUCKET_NAME)
+    return _BUCKET
+
+def download_oauth_store():
     """
-    Download the OAuth token file from Google Cloud Storage to local storage.
-    Returns True if the file exists and is downloaded; otherwise, False.
+    Download the OAuth token store from Google Cloud Storage straight into memory.
+    Returns the token fields for MyBMWAccount.set_refresh_token, or None if no token exists.
     """
-    client = storage.Client()
-    bucket = client.bucket(BUCKET_NAME)
-    blob = bucket.blob(OAUTH_FILENAME)
-
-    if blob.exists():
-        blob.download_to_filename(LOCAL_TOKEN_FILE)
-        print("✅ OAuth token downloaded from GCS.")
-        return True
-    print("⚠️ No existing OAuth token found in GCS.")
-    return False
-
-def upload_oauth_file():
+    blob = _bucket().blob(OAUTH_FILENAME)
+
+    try:
+        oauth_data = orjson.loads(blob.download_as_bytes())
+    except NotFound:
+        print("⚠️ No existing OAuth token found in GCS.")
+        return None
+    except orjson.JSONDecodeError:
+        print("⚠️ Stored OAuth token is not valid JSON.")
+        return None
+
+    session_id_timestamp = oauth_data.pop("session_id_timestamp", None)
+    if time.time() - (session_id_timestamp or 0) > SESSION_ID_MAX_AGE:
+        oauth_data.pop("session_id", None)
+    print("✅ OAuth token downloaded from GCS.")
+    return oauth_data
+
+def upload_oauth_store(account):
     """
-    Upload the OAuth token file from local storage to Google Cloud Storage.
+    Serialize the account's OAuth tokens and upload them to Google Cloud Storage.
     This ensures the token remains updated after executing remote commands.
     """
-    client = storage.Client()
-    bucket = client.bucket(BUCKET_NAME)
-    blob = bucket.blob(OAUTH_FILENAME)
+    authentication = account.config.authentication
+    oauth_data = {
+        "refresh_token": authentication.refresh_token,
+        "gcid": authentication.gcid,
+        "access_token": authentication.access_token,
+        "session_id": authentication.session_id,
+        "session_id_timestamp": time.time(),
+    }
+    _bucket().blob(OAUTH_FILENAME).upload_from_string(orjson.dumps(oauth_data), content_type="application/json")
+    print("✅ OAuth token uploaded to GCS.")
+
+# 🔹 Health Check Payload
+
+def _build_health_body():
+    """
+    Serialize the /health payload once per container.
+    The fingerprint inputs never change for the container lifetime.
+    """
+    try:
+        from fingerprint_patch import _get_system_uuid, _generate_build_string
+        system_uuid = _get_system_uuid()
+        build_string = _generate_build_string(system_uuid)
+        x_user_agent = f"android({build_string});bmw;2.20.3;row"
+        
+        health_data = {
+            "status": "healthy",
+            "service": "bmw-api-fixed",
+            "version": "1.0.0",
+            "fingerprint": {
+                "enabled": True,
+                "system_uuid": system_uuid,
+                "build_string": build_string,
+                "x_user_agent": x_user_agent
+            }
+        }
+    except Exception as e:
+        health_data = {
+            "status": "healthy",
+            "service": "bmw-api-fixed",
+            "version": "1.0.0",
+            "fingerprint": {"error": str(e)}
+        }
+    return orjson.dumps(health_data)
+
+_HEALTH_BODY = _build_health_body()
+_HEALTH_HEADERS = {**_CORS_JSON_HEADERS, "Content-Type": "application/json"}
+
+# 🔹 Vehicle Action Execution
+
+async def _execute(account, wkn, action):
+    """
+    Fetch vehicles, persist the OAuth token and run the requested action inside one event loop.
+    Returns the vehicle together with the action result.
+    """
+    # ✅ Fetch vehicles asynchronously
+    await account.get_vehicles()
+    # ✅ Persist the refreshed OAuth token before any remote command can fail
+    upload_oauth_store(account)
+    # Retrieve the vehicle by its WKN
+    vehicle = account.get_vehicle(wkn)
+    # Initialize RemoteServices for remote commands
+    remote_services = RemoteServices(vehicle)
 
-    if os.path.exists(LOCAL_TOKEN_FILE):
-        blob.upload_from_filename(LOCAL_TOKEN_FILE)
-        print("✅ OAuth token uploaded to GCS.")
+    # Initialize the variable to store action results.
+    action_result = None
+
+    # ✅ Handle Remote Actions Based on the "action" parameter.
+    if action == "lock":
+        print("🔒 Locking vehicle...")
+        try:
+            result = await asyncio.wait_for(remote_services.trigger_remote_door_lock(), timeout=90)
+            action_result = result.state.value if result and hasattr(result, "state") else "Unknown lock status"
+        except asyncio.TimeoutError:
+            action_result = "Locking operation timed out after 90 seconds"
+    elif action == "unlock":
+        print("🔓 Unlocking vehicle...")
+        try:
+            result = await asyncio.wait_for(remote_services.trigger_remote_door_unlock(), timeout=90)
+            action_result = result.state.value if result and hasattr(result, "state") else "Unknown unlock status"
+        except asyncio.TimeoutError:
+            action_result = "Unlocking operation timed out after 90 seconds"
+    elif action == "flash":
+        print("💡 Flashing headlights...")
+        result = await remote_services.trigger_remote_light_flash()
+        action_result = result.state.value if result and hasattr(result, "state") else "Unknown flash status"
+    elif action == "ac":
+        print("❄️ Activating air conditioning...")
+        result = await remote_services.trigger_remote_service(Services.AIR_CONDITIONING)
+        action_result = result.state.value if result and hasattr(result, "state") else "Unknown AC status"
+    elif action == "fuel":
+        fuel_and_battery = vehicle.fuel_and_battery
+        action_result = {
+            "remaining_fuel": fuel_and_battery.remaining_fuel,
+            "remaining_fuel_percent": fuel_and_battery.remaining_fuel_percent,
+            "remaining_range_fuel": fuel_and_battery.remaining_range_fuel,
+            "remaining_range_electric": fuel_and_battery.remaining_range_electric,
+            "remaining_range_total": fuel_and_battery.remaining_range_total,
+        }
+    elif action == "location":
+        # Resolve the nested location objects once instead of per field
+        location = vehicle.location
+        coordinates = location.location if location else None
+        timestamp = location.vehicle_update_timestamp if location else None
+        action_result = {
+            "latitude": coordinates.latitude if coordinates else None,
+            "longitude": coordinates.longitude if coordinates else None,
+            "heading": location.heading if location else None,
+            "timestamp": timestamp.isoformat() if timestamp else None,
+        }
+    elif action == "check_control":
+        report = vehicle.check_control_message_report
+        messages = report.messages
+        action_result = {
+            "has_check_control_messages": report.has_check_control_messages,
+            "messages": [msg.to_dict() for msg in messages] if messages else []
+        }
+    elif action == "mileage":
+        mileage = vehicle.mileage
+        action_result = {
+            "value": mileage.value if hasattr(mileage, "value") else mileage,
+            "unit": mileage.unit if hasattr(mileage, "unit") else "unknown"
+        }
+    elif action == "lock_status":
+        # Return the full door lock state as provided by the API.
+        print("🔍 Retrieving door lock status...")
+        lock_state = vehicle.doors_windows.lock_state if hasattr(vehicle, "doors_windows") else None
+        action_result = lock_state.value if lock_state and hasattr(lock_state, "value") else "Unknown"
+    elif action == "is_locked":
+        # New Action: Return only whether the doors are locked or unlocked.
+        print("🔍 Checking if doors are strictly locked or unlocked...")
+        lock_state = vehicle.doors_windows.lock_state if hasattr(vehicle, "doors_windows") else None
+        if lock_state and hasattr(lock_state, "value"):
+            if lock_state.value == "LOCKED":
+                action_result = "locked"
+            elif lock_state.value == "UNLOCKED":
+                action_result = "unlocked"
+            else:
+                action_result = f"Intermediate state: {lock_state.value}"
+        else:
+            action_result = "Unknown"
     else:
-        print("⚠️ No OAuth token file found locally to upload.")
+        print("🚗 No valid remote action specified. Returning vehicle details.")
+        action_result = "No valid action specified. Returning vehicle details."
+
+    return vehicle, action_result
 
 # 🔹 Main Cloud Function Handler
 
@@ -72,42 +239,11 @@ def bmw_api(request):
     """
     # ✅ Handle CORS (Preflight Requests)
     if request.method == "OPTIONS":
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST",
-            "Access-Control-Allow-Headers": "Content-Type",
-        }
-        return ("", 204, headers)
+        return _PREFLIGHT_RESPONSE
     
-    # ✅ Handle health check
+    # ✅ Handle health check (body is pre-serialized at import)
     if request.method == "GET" and request.path == "/health":
-        try:
-            from fingerprint_patch import _get_system_uuid, _generate_build_string
-            system_uuid = _get_system_uuid()
-            build_string = _generate_build_string(system_uuid)
-            x_user_agent = f"android({build_string});bmw;2.20.3;row"
-            
-            health_data = {
-                "status": "healthy",
-                "service": "bmw-api-fixed",
-                "version": "1.0.0",
-                "fingerprint": {
-                    "enabled": True,
-                    "system_uuid": system_uuid,
-                    "build_string": build_string,
-                    "x_user_agent": x_user_agent
-                }
-            }
-        except Exception as e:
-            health_data = {
-                "status": "healthy",
-                "service": "bmw-api-fixed",
-                "version": "1.0.0",
-                "fingerprint": {"error": str(e)}
-            }
-        
-        headers = {"Access-Control-Allow-Origin": "*"}
-        return (jsonify(health_data), 200, headers)
+        return (_HEALTH_BODY, 200, _HEALTH_HEADERS)
 
     # ✅ Parse incoming JSON request and validate required fields
     try:
@@ -126,13 +262,13 @@ def bmw_api(request):
     hcaptcha_token = data.get("hcaptcha")
 
     # ✅ Attempt to load an existing OAuth token from GCS
-    has_token_file = download_oauth_file()
+    oauth_data = download_oauth_store()
 
     # ✅ Initialize the MyBMWAccount instance.
-    if has_token_file:
+    if oauth_data:
         print("🔄 Re-authenticating using stored OAuth token...")
         account = MyBMWAccount(provided_email, provided_password, Regions.REST_OF_WORLD)
-        load_oauth_store_from_file(Path(LOCAL_TOKEN_FILE), account)
+        account.set_refresh_token(**oauth_data)
     elif not hcaptcha_token:
         return jsonify({"error": "Missing hCaptcha token on first authentication"}), 400
     else:
@@ -142,16 +278,8 @@ def bmw_api(request):
         account = MyBMWAccount(provided_email, provided_password, Regions.REST_OF_WORLD)
 
     try:
-        # ✅ Fetch vehicles asynchronously
-        asyncio.run(account.get_vehicles())
-        # Retrieve the vehicle by its WKN
-        vehicle = account.get_vehicle(wkn)
-        # Initialize RemoteServices for remote commands
-        remote_services = RemoteServices(vehicle)
-
-        # ✅ After remote execution, update and persist the OAuth token
-        store_oauth_store_to_file(Path(LOCAL_TOKEN_FILE), account)
-        upload_oauth_file()
+        # ✅ Fetch vehicles and execute the action in a single event loop
+        vehicle, action_result = asyncio.run(_execute(account, wkn, action))
 
         # Initialize a dictionary for vehicle information to include in the response.
         response_data = {
@@ -160,90 +288,10 @@ def bmw_api(request):
             "vin": vehicle.vin,
         }
 
-        # Initialize the variable to store action results.
-        action_result = None
-
-        # ✅ Handle Remote Actions Based on the "action" parameter.
-        if action == "lock":
-            print("🔒 Locking vehicle...")
-            try:
-                result = asyncio.run(asyncio.wait_for(remote_services.trigger_remote_door_lock(), timeout=90))
-                action_result = result.state.value if result and hasattr(result, "state") else "Unknown lock status"
-            except asyncio.TimeoutError:
-                action_result = "Locking operation timed out after 90 seconds"
-        elif action == "unlock":
-            print("🔓 Unlocking vehicle...")
-            try:
-                result = asyncio.run(asyncio.wait_for(remote_services.trigger_remote_door_unlock(), timeout=90))
-                action_result = result.state.value if result and hasattr(result, "state") else "Unknown unlock status"
-            except asyncio.TimeoutError:
-                action_result = "Unlocking operation timed out after 90 seconds"
-        elif action == "flash":
-            print("💡 Flashing headlights...")
-            result = asyncio.run(remote_services.trigger_remote_light_flash())
-            action_result = result.state.value if result and hasattr(result, "state") else "Unknown flash status"
-        elif action == "ac":
-            print("❄️ Activating air conditioning...")
-            result = asyncio.run(remote_services.trigger_remote_service(Services.AIR_CONDITIONING))
-            action_result = result.state.value if result and hasattr(result, "state") else "Unknown AC status"
-        elif action == "fuel":
-            fuel_and_battery = vehicle.fuel_and_battery
-            action_result = {
-                "remaining_fuel": fuel_and_battery.remaining_fuel,
-                "remaining_fuel_percent": fuel_and_battery.remaining_fuel_percent,
-                "remaining_range_fuel": fuel_and_battery.remaining_range_fuel,
-                "remaining_range_electric": fuel_and_battery.remaining_range_electric,
-                "remaining_range_total": fuel_and_battery.remaining_range_total,
-            }
-        elif action == "location":
-            location = vehicle.location
-            action_result = {
-                "latitude": location.location.latitude if location and location.location else None,
-                "longitude": location.location.longitude if location and location.location else None,
-                "heading": location.heading,
-                "timestamp": location.vehicle_update_timestamp.isoformat() if location and location.vehicle_update_timestamp else None,
-            }
-        elif action == "check_control":
-            report = vehicle.check_control_message_report
-            action_result = {
-                "has_check_control_messages": report.has_check_control_messages,
-                "messages": [msg.to_dict() for msg in report.messages] if report.messages else []
-            }
-        elif action == "mileage":
-            mileage = vehicle.mileage
-            action_result = {
-                "value": mileage.value if hasattr(mileage, "value") else mileage,
-                "unit": mileage.unit if hasattr(mileage, "unit") else "unknown"
-            }
-        elif action == "lock_status":
-            # Return the full door lock state as provided by the API.
-            print("🔍 Retrieving door lock status...")
-            lock_state = vehicle.doors_windows.lock_state if hasattr(vehicle, "doors_windows") else None
-            action_result = lock_state.value if lock_state and hasattr(lock_state, "value") else "Unknown"
-        elif action == "is_locked":
-            # New Action: Return only whether the doors are locked or unlocked.
-            print("🔍 Checking if doors are strictly locked or unlocked...")
-            lock_state = vehicle.doors_windows.lock_state if hasattr(vehicle, "doors_windows") else None
-            if lock_state and hasattr(lock_state, "value"):
-                if lock_state.value == "LOCKED":
-                    action_result = "locked"
-                elif lock_state.value == "UNLOCKED":
-                    action_result = "unlocked"
-                else:
-                    action_result = f"Intermediate state: {lock_state.value}"
-            else:
-                action_result = "Unknown"
-        else:
-            print("🚗 No valid remote action specified. Returning vehicle details.")
-            action_result = "No valid action specified. Returning vehicle details."
-
         # Include the remote action result in the response data.
         response_data["action_result"] = action_result
 
-        headers = {
-            "Access-Control-Allow-Origin": "*"
-        }
-        return (jsonify(response_data), 200, headers)
+        return (jsonify(response_data), 200, _CORS_JSON_HEADERS)
 
     except Exception as e:
         return jsonify({"error": f"Failed to process request: {str(e)}"}), 500
@@ -11,23 +11,46 @@ Based on main_stateless.py foundation but simplified:
 """
 
 import asyncio
+import concurrent.futures
+import gzip
+import hashlib
 import json
 import logging
+import orjson
 import os
+import threading
+import time
 import functions_framework
-from flask import jsonify
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+# Brotli is optional; gzip is used when it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# uvloop is optional; when present the shared event loop below runs on libuv
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
 
 # CRITICAL: Apply Android patch BEFORE importing bimmer_connected
 # This replicates the Docker workaround approach
 try:
     from utils.bmw_android_patch import apply_android_patch, get_patch_info
-    patch_success = apply_android_patch()
+    # Importing the patch module already applies it; only retry if that did not take
+    patch_success = get_patch_info().get("patch_active", False) or apply_android_patch()
     print(f"🔧 Android patch result: {'✅ Success' if patch_success else '❌ Failed'}")
+    # Patch state is fixed from here on, so the info is built once per container
+    _PATCH_INFO = get_patch_info()
 except Exception as e:
     print(f"⚠️ Android patch error: {e}")
     patch_success = False
+    _PATCH_INFO = {"error": str(e)}
 
 # NOW import bimmer_connected (after patch is applied)
 try:
@@ -40,9 +63,113 @@ except ImportError as e:
     Regions = None
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
+# Authenticated accounts reused by warm instances: credentials hash -> (account, expiry)
+# Access tokens live ~1h; entries expire a little earlier so a cached token is never stale
+# bimmer_connected 0.17 opens its own httpx client per API call and takes no external
+# session, so reusing the account (and its OAuth token) is what saves the handshake here
+ACCOUNT_CACHE_TTL = 3300
+ACCOUNT_CACHE_MAX = 32
+_ACCOUNT_CACHE: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+# Held only around dict updates, never across an await
+_ACCOUNT_LOCK = threading.Lock()
+
+# Upper bound for one request's coroutine, so a stuck upstream cannot hold a handler thread
+REQUEST_TIMEOUT = 120  # seconds
+
+# Background event loop shared by all requests; handler threads submit
+# coroutines to it instead of creating and closing a loop per request
+_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_LOOP.run_forever, name="bmw-api-loop", daemon=True).start()
+
+
+def _account_key(email: str, password: str) -> str:
+    """Hash credentials so the cache never holds them in plain text"""
+    return hashlib.blake2b(f"{email}\0{password}".encode(), digest_size=16).hexdigest()
+
+
+def _get_cached_account(key: str):
+    """Return the cached account for key if its token is still valid"""
+    with _ACCOUNT_LOCK:
+        entry = _ACCOUNT_CACHE.get(key)
+        if entry is None:
+            return None
+        account, expiry = entry
+        if time.time() >= expiry - 60:
+            del _ACCOUNT_CACHE[key]
+            return None
+        _ACCOUNT_CACHE.move_to_end(key)
+        return account
+
+
+def _store_account(key: str, account) -> None:
+    """Cache an authenticated account, evicting the least recently used entry"""
+    with _ACCOUNT_LOCK:
+        _ACCOUNT_CACHE[key] = (account, time.time() + ACCOUNT_CACHE_TTL)
+        _ACCOUNT_CACHE.move_to_end(key)
+        while len(_ACCOUNT_CACHE) > ACCOUNT_CACHE_MAX:
+            _ACCOUNT_CACHE.popitem(last=False)
+
+
+def _evict_account(email: str, password: str) -> None:
+    """Drop cached credentials, e.g. after BMW rejects the token with 401"""
+    with _ACCOUNT_LOCK:
+        _ACCOUNT_CACHE.pop(_account_key(email, password), None)
+
+
+# Fields every request must provide (non-empty)
+_REQUIRED_FIELDS = ("email", "password", "action")
+
+# CORS preflight reply, built once; Max-Age lets browsers cache it for a day
+_PREFLIGHT_RESPONSE = ("", 204, {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST, GET",
+    "Access-Control-Allow-Headers": "Content-Type",
+    "Access-Control-Max-Age": "86400",
+})
+
+# JSON response headers (CORS on every reply)
+_JSON_HEADERS = {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+# Bodies above this size are compressed when the client accepts it
+_COMPRESS_MIN_BYTES = 1024
+
+
+def _orjson_default(obj):
+    """Serialize bimmer_connected's NamedTuple values (e.g. ValueWithUnit) as lists like stdlib json"""
+    if isinstance(obj, tuple):
+        return list(obj)
+    raise TypeError
+
+
+def _json(obj, status: int = 200, accept_encoding: str = ""):
+    """Build a Flask response tuple with an orjson-encoded body, compressed when large"""
+    body = orjson.dumps(obj, default=_orjson_default)
+    if len(body) > _COMPRESS_MIN_BYTES and accept_encoding:
+        if brotli is not None and "br" in accept_encoding:
+            return (brotli.compress(body, quality=4), status,
+                    {**_JSON_HEADERS, "Content-Encoding": "br", "Vary": "Accept-Encoding"})
+        if "gzip" in accept_encoding:
+            return (gzip.compress(body, compresslevel=5), status,
+                    {**_JSON_HEADERS, "Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+    return (body, status, _JSON_HEADERS)
+
+
+# Remote service -> (RemoteServices method, success message)
+_SERVICE_DISPATCH = {
+    'lock': ('trigger_remote_door_lock', 'Vehicle locked successfully'),
+    'unlock': ('trigger_remote_door_unlock', 'Vehicle unlocked successfully'),
+    'flash': ('trigger_remote_light_flash', 'Lights flashed successfully'),
+    'horn': ('trigger_remote_horn', 'Horn activated successfully'),
+    'climate': ('trigger_remote_air_conditioning', 'Climate control activated successfully'),
+}
+
+
+def _is_unauthorized(error: Optional[str]) -> bool:
+    """Check whether an error message reports a rejected token"""
+    return bool(error) and ("401" in error or "unauthorized" in error.lower())
+
 
 async def authenticate_bmw_simple(email: str, password: str, hcaptcha_token: Optional[str] = None) -> Dict[str, Any]:
     """
@@ -54,10 +181,10 @@ async def authenticate_bmw_simple(email: str, password: str, hcaptcha_token: Opt
         hcaptcha_token: Optional hCaptcha token
         
     Returns:
-        Dict with success status and account or error
+        Dict with success status, account and vehicles indexed by VIN, or error
     """
     try:
-        print(f"🔐 Simple authentication for {email}...")
+        logger.debug("Simple authentication for %s", email)
         
         if not MyBMWAccount:
             return {
@@ -65,29 +192,44 @@ async def authenticate_bmw_simple(email: str, password: str, hcaptcha_token: Opt
                 'error': 'bimmer_connected library not available'
             }
         
-        # Create BMW account using standard bimmer_connected approach
-        # The Android patch ensures BMW sees our unique fingerprint
-        print("🚗 Creating MyBMWAccount...")
-        account = MyBMWAccount(
-            username=email,
-            password=password,
-            region=Regions.REST_OF_WORLD,
-            hcaptcha_token=hcaptcha_token
-        )
-        
-        # Test authentication by getting vehicles
-        print("📋 Testing authentication by fetching vehicles...")
-        vehicles = await account.get_vehicles()
-        
-        print(f"✅ Authentication successful! Found {len(vehicles)} vehicles")
+        # Reuse an account authenticated by an earlier request on this instance
+        cache_key = _account_key(email, password)
+        account = _get_cached_account(cache_key)
+        if account is not None:
+            # Token still valid: refresh vehicle state without a new login
+            logger.debug("Reusing cached authenticated account")
+            await account.get_vehicles()
+        else:
+            # Create BMW account using standard bimmer_connected approach
+            # The Android patch ensures BMW sees our unique fingerprint
+            logger.debug("Creating MyBMWAccount")
+            account = MyBMWAccount(
+                username=email,
+                password=password,
+                region=Regions.REST_OF_WORLD,
+                hcaptcha_token=hcaptcha_token
+            )
+            
+            # Test authentication by getting vehicles
+            logger.debug("Testing authentication by fetching vehicles")
+            await account.get_vehicles()
+            _store_account(cache_key, account)
+        
+        # Index the fetched vehicles so the action helpers need no second round-trip
+        vehicles_by_vin = {vehicle.vin: vehicle for vehicle in account.vehicles}
+        
+        logger.info("Authentication successful, found %d vehicles", len(vehicles_by_vin))
         return {
             'success': True,
             'account': account,
-            'vehicles_count': len(vehicles)
+            'vehicles_by_vin': vehicles_by_vin,
+            'vehicles_count': len(vehicles_by_vin)
         }
         
     except Exception as e:
-        print(f"❌ Authentication failed: {e}")
+        logger.error("Authentication failed: %s", e)
+        if _is_unauthorized(str(e)):
+            _evict_account(email, password)
         return {
             'success': False,
             'error': str(e),
@@ -95,23 +237,22 @@ async def authenticate_bmw_simple(email: str, password: str, hcaptcha_token: Opt
         }
 
 
-async def get_vehicles_simple(account: MyBMWAccount) -> Dict[str, Any]:
+async def get_vehicles_simple(vehicles_by_vin: Dict[str, Any]) -> Dict[str, Any]:
     """
     Get vehicles using bimmer_connected account
     
     Args:
-        account: Authenticated MyBMWAccount instance
+        vehicles_by_vin: Vehicles fetched during authentication, keyed by VIN
         
     Returns:
         Dict with vehicles list or error
     """
     try:
-        print("🚗 Fetching vehicles...")
-        vehicles = await account.get_vehicles()
+        logger.debug("Listing vehicles")
         
         # Convert vehicles to serializable format
         vehicles_data = []
-        for vehicle in vehicles:
+        for vehicle in vehicles_by_vin.values():
             vehicle_data = {
                 'vin': vehicle.vin,
                 'name': vehicle.name,
@@ -128,19 +269,19 @@ async def get_vehicles_simple(account: MyBMWAccount) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        print(f"❌ Error fetching vehicles: {e}")
+        logger.error("Error fetching vehicles: %s", e)
         return {
             'success': False,
             'error': str(e)
         }
 
 
-async def execute_remote_service_simple(account: MyBMWAccount, vin: str, service: str) -> Dict[str, Any]:
+async def execute_remote_service_simple(vehicles_by_vin: Dict[str, Any], vin: str, service: str) -> Dict[str, Any]:
     """
     Execute remote service using bimmer_connected
     
     Args:
-        account: Authenticated MyBMWAccount instance
+        vehicles_by_vin: Vehicles fetched during authentication, keyed by VIN
         vin: Vehicle identification number
         service: Service to execute (lock, unlock, flash, etc.)
         
@@ -148,16 +289,10 @@ async def execute_remote_service_simple(account: MyBMWAccount, vin: str, service
         Dict with service result or error
     """
     try:
-        print(f"🔧 Executing {service} on vehicle {vin}...")
+        logger.debug("Executing %s on vehicle %s", service, vin)
         
         # Find the vehicle
-        vehicles = await account.get_vehicles()
-        target_vehicle = None
-        
-        for vehicle in vehicles:
-            if vehicle.vin == vin:
-                target_vehicle = vehicle
-                break
+        target_vehicle = vehicles_by_vin.get(vin)
         
         if not target_vehicle:
             return {
@@ -166,28 +301,16 @@ async def execute_remote_service_simple(account: MyBMWAccount, vin: str, service
             }
         
         # Execute the service based on type
-        if service == 'lock':
-            await target_vehicle.remote_services.trigger_remote_door_lock()
-            message = 'Vehicle locked successfully'
-        elif service == 'unlock':
-            await target_vehicle.remote_services.trigger_remote_door_unlock()
-            message = 'Vehicle unlocked successfully'
-        elif service == 'flash':
-            await target_vehicle.remote_services.trigger_remote_light_flash()
-            message = 'Lights flashed successfully'
-        elif service == 'horn':
-            await target_vehicle.remote_services.trigger_remote_horn()
-            message = 'Horn activated successfully'
-        elif service == 'climate':
-            await target_vehicle.remote_services.trigger_remote_air_conditioning()
-            message = 'Climate control activated successfully'
-        else:
+        try:
+            method_name, message = _SERVICE_DISPATCH[service]
+        except KeyError:
             return {
                 'success': False,
                 'error': f'Unknown service: {service}'
             }
+        await getattr(target_vehicle.remote_services, method_name)()
         
-        print(f"✅ Service {service} executed successfully")
+        logger.info("Service %s executed successfully", service)
         return {
             'success': True,
             'service': service,
@@ -196,7 +319,7 @@ async def execute_remote_service_simple(account: MyBMWAccount, vin: str, service
         }
         
     except Exception as e:
-        print(f"❌ Error executing service {service}: {e}")
+        logger.error("Error executing service %s: %s", service, e)
         return {
             'success': False,
             'error': str(e),
@@ -205,28 +328,22 @@ async def execute_remote_service_simple(account: MyBMWAccount, vin: str, service
         }
 
 
-async def get_vehicle_status_simple(account: MyBMWAccount, vin: str) -> Dict[str, Any]:
+async def get_vehicle_status_simple(vehicles_by_vin: Dict[str, Any], vin: str) -> Dict[str, Any]:
     """
     Get vehicle status using bimmer_connected
     
     Args:
-        account: Authenticated MyBMWAccount instance
+        vehicles_by_vin: Vehicles fetched during authentication, keyed by VIN
         vin: Vehicle identification number
         
     Returns:
         Dict with vehicle status or error
     """
     try:
-        print(f"📊 Getting status for vehicle {vin}...")
+        logger.debug("Getting status for vehicle %s", vin)
         
         # Find the vehicle
-        vehicles = await account.get_vehicles()
-        target_vehicle = None
-        
-        for vehicle in vehicles:
-            if vehicle.vin == vin:
-                target_vehicle = vehicle
-                break
+        target_vehicle = vehicles_by_vin.get(vin)
         
         if not target_vehicle:
             return {
@@ -242,36 +359,28 @@ async def get_vehicle_status_simple(account: MyBMWAccount, vin: str) -> Dict[str
             'model': getattr(target_vehicle, 'model', 'Unknown'),
         }
         
-        # Try to get additional status if available
-        try:
-            if hasattr(target_vehicle, 'fuel_and_battery'):
-                fuel_battery = target_vehicle.fuel_and_battery
-                status['fuel'] = {
-                    'level': getattr(fuel_battery, 'remaining_fuel_percent', None),
-                    'range': getattr(fuel_battery, 'remaining_range_fuel', None)
-                }
-        except:
-            pass
+        # Add status sections when available
+        # These properties read the state loaded by get_vehicles(); none of them issue requests
+        fuel_battery = getattr(target_vehicle, 'fuel_and_battery', None)
+        if fuel_battery is not None:
+            status['fuel'] = {
+                'level': getattr(fuel_battery, 'remaining_fuel_percent', None),
+                'range': getattr(fuel_battery, 'remaining_range_fuel', None)
+            }
         
-        try:
-            if hasattr(target_vehicle, 'vehicle_location'):
-                location = target_vehicle.vehicle_location
-                status['location'] = {
-                    'latitude': getattr(location, 'latitude', None),
-                    'longitude': getattr(location, 'longitude', None),
-                    'address': getattr(location, 'address', None)
-                }
-        except:
-            pass
+        location = getattr(target_vehicle, 'vehicle_location', None)
+        if location is not None:
+            status['location'] = {
+                'latitude': getattr(location, 'latitude', None),
+                'longitude': getattr(location, 'longitude', None),
+                'address': getattr(location, 'address', None)
+            }
         
-        try:
-            if hasattr(target_vehicle, 'doors_and_windows'):
-                doors = target_vehicle.doors_and_windows
-                status['doors'] = {
-                    'locked': getattr(doors, 'door_lock_state', None),
-                }
-        except:
-            pass
+        doors = getattr(target_vehicle, 'doors_and_windows', None)
+        if doors is not None:
+            status['doors'] = {
+                'locked': getattr(doors, 'door_lock_state', None),
+            }
         
         return {
             'success': True,
@@ -279,7 +388,7 @@ async def get_vehicle_status_simple(account: MyBMWAccount, vin: str) -> Dict[str
         }
         
     except Exception as e:
-        print(f"❌ Error getting vehicle status: {e}")
+        logger.error("Error getting vehicle status: %s", e)
         return {
             'success': False,
             'error': str(e)
@@ -294,73 +403,68 @@ def bmw_api_simple(request):
     
     # Handle CORS
     if request.method == "OPTIONS":
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, GET",
-            "Access-Control-Allow-Headers": "Content-Type",
-        }
-        return ("", 204, headers)
+        return _PREFLIGHT_RESPONSE
     
     # Health check endpoint
     if request.method == "GET" and request.path == "/health":
-        patch_info = get_patch_info()
         health_data = {
             "status": "healthy",
             "service": "bmw-api-simple",
             "version": "1.0.0",
             "implementation": "docker_workaround_with_bimmer_connected",
-            "patch_info": patch_info,
+            "patch_info": _PATCH_INFO,
             "bimmer_connected_available": MyBMWAccount is not None,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         }
-        return jsonify(health_data)
+        return _json(health_data)
     
     # Parse request
     try:
-        data = request.get_json()
+        data = orjson.loads(request.get_data())
         
         if not data:
-            return jsonify({
+            return _json({
                 "error": "Request body must be valid JSON"
-            }), 400
+            }, 400)
         
-        # Check required fields
-        required_fields = ["email", "password", "action"]
-        missing_fields = [field for field in required_fields if field not in data or not data[field]]
+        # Extract parameters; the missing-field list is only built on failure
+        email = data.get("email")
+        password = data.get("password")
+        action = data.get("action")
         
-        if missing_fields:
-            return jsonify({
+        if not (email and password and action):
+            missing_fields = [field for field in _REQUIRED_FIELDS if not data.get(field)]
+            return _json({
                 "error": f"Missing required fields: {', '.join(missing_fields)}",
-                "required": required_fields
-            }), 400
+                "required": list(_REQUIRED_FIELDS)
+            }, 400)
             
     except Exception as e:
-        return jsonify({
+        return _json({
             "error": "Invalid JSON format",
             "details": str(e)
-        }), 400
+        }, 400)
     
-    # Extract parameters
-    email = data["email"]
-    password = data["password"]
-    action = data["action"]
+    # Optional parameters
     wkn = data.get("wkn", "")
     hcaptcha_token = data.get("hcaptcha")
     
-    print(f"🚗 Processing BMW API Simple request...")
-    print(f"📧 Email: {email}")
-    print(f"📋 Action: {action}")
-    print(f"🎯 WKN: {wkn}")
-    print(f"🔧 Android patch: {'✅ Applied' if patch_success else '❌ Failed'}")
+    logger.debug("Processing request email=%s action=%s wkn=%s patch_applied=%s", email, action, wkn, patch_success)
     
-    # Create event loop for async operations
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    # Reject requests that cannot succeed before doing any BMW I/O (auth + vehicle fetch)
+    if action != "status" and action not in _SERVICE_DISPATCH:
+        return _json({
+            "error": f"Unknown action: {action}",
+            "available_actions": ["status", *_SERVICE_DISPATCH]
+        }, 400)
+    if action in _SERVICE_DISPATCH and not wkn:
+        return _json({
+            "error": "WKN (VIN) required for remote services"
+        }, 400)
     
     try:
         async def process_request():
             # Step 1: Authenticate with BMW (using patched bimmer_connected)
-            print("🔐 Step 1: Authenticating...")
             auth_result = await authenticate_bmw_simple(email, password, hcaptcha_token)
             
             if not auth_result['success']:
@@ -371,28 +475,30 @@ def bmw_api_simple(request):
                     "hint": "Check credentials or try with hCaptcha token"
                 }, 401
             
-            account = auth_result['account']
+            vehicles_by_vin = auth_result['vehicles_by_vin']
             
             # Step 2: Handle different actions
             if action == "status":
                 if wkn:
                     # Get specific vehicle status
-                    status_result = await get_vehicle_status_simple(account, wkn)
+                    status_result = await get_vehicle_status_simple(vehicles_by_vin, wkn)
                     if status_result['success']:
                         return {
                             "success": True,
                             "action": "status",
                             "vehicle": status_result['vehicle_status'],
                             "implementation": "docker_workaround",
-                            "patch_info": get_patch_info()
+                            "patch_info": _PATCH_INFO
                         }, 200
                     else:
+                        if _is_unauthorized(status_result['error']):
+                            _evict_account(email, password)
                         return {
                             "error": status_result['error']
                         }, 404
                 else:
                     # Get all vehicles
-                    vehicles_result = await get_vehicles_simple(account)
+                    vehicles_result = await get_vehicles_simple(vehicles_by_vin)
                     if vehicles_result['success']:
                         return {
                             "success": True,
@@ -400,21 +506,18 @@ def bmw_api_simple(request):
                             "vehicles": vehicles_result['vehicles'],
                             "count": vehicles_result['count'],
                             "implementation": "docker_workaround",
-                            "patch_info": get_patch_info()
+                            "patch_info": _PATCH_INFO
                         }, 200
                     else:
+                        if _is_unauthorized(vehicles_result['error']):
+                            _evict_account(email, password)
                         return {
                             "error": vehicles_result['error']
                         }, 500
             
-            elif action in ["lock", "unlock", "flash", "horn", "climate"]:
-                if not wkn:
-                    return {
-                        "error": "WKN (VIN) required for remote services"
-                    }, 400
-                
-                # Execute remote service
-                service_result = await execute_remote_service_simple(account, wkn, action)
+            else:
+                # Execute remote service (action and WKN validated before authenticating)
+                service_result = await execute_remote_service_simple(vehicles_by_vin, wkn, action)
                 
                 if service_result['success']:
                     return {
@@ -423,47 +526,41 @@ def bmw_api_simple(request):
                         "vehicle": wkn,
                         "message": service_result['message'],
                         "implementation": "docker_workaround",
-                        "patch_info": get_patch_info()
+                        "patch_info": _PATCH_INFO
                     }, 200
                 else:
+                    if _is_unauthorized(service_result['error']):
+                        _evict_account(email, password)
                     return {
                         "error": service_result['error'],
                         "action": action,
                         "vehicle": wkn
                     }, 500
-            
-            else:
-                return {
-                    "error": f"Unknown action: {action}",
-                    "available_actions": ["status", "lock", "unlock", "flash", "horn", "climate"]
-                }, 400
-        
-        # Run the async process
-        result, status_code = loop.run_until_complete(process_request())
-        
-        # Add CORS headers to response
-        response = jsonify(result)
-        response.headers["Access-Control-Allow-Origin"] = "*"
         
-        return response, status_code
+        # Run the async process on the shared background loop
+        future = asyncio.run_coroutine_threadsafe(process_request(), _LOOP)
+        try:
+            result, status_code = future.result(timeout=REQUEST_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logger.error("Request timed out after %d seconds", REQUEST_TIMEOUT)
+            result, status_code = {
+                "error": "BMW servers took too long to respond",
+                "timeout": f"{REQUEST_TIMEOUT} seconds"
+            }, 504
+        
+        # Serialize with orjson; CORS headers are part of _JSON_HEADERS
+        return _json(result, status_code, request.headers.get("Accept-Encoding", ""))
         
     except Exception as e:
-        print(f"❌ Error processing request: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error processing request: %s", e)
         
-        return jsonify({
+        return _json({
             "error": "Internal server error",
             "details": str(e),
             "implementation": "docker_workaround",
             "patch_applied": patch_success
-        }), 500
-    
-    finally:
-        try:
-            loop.close()
-        except:
-            pass
+        }, 500)
 
 
 # Local testing
@@ -472,8 +569,7 @@ if __name__ == "__main__":
     print("=" * 50)
     
     # Show patch info
-    patch_info = get_patch_info()
-    print(f"Patch info: {patch_info}")
+    print(f"Patch info: {_PATCH_INFO}")
     
     print("\nReady for testing!")
     print("Use curl to test the API endpoints")
\ No newline at end of file
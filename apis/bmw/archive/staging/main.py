@@ -9,6 +9,10 @@ Key Features:
 - Always requires fresh hCaptcha verification
 - Completely stateless operation
 - Enhanced security through ephemeral authentication
+- A redeemed hCaptcha token's session is kept in memory only (110s), so a
+  client retry with the same token skips a second BMW login
+- Optional warm cache (BMW_ALLOW_WARM_CACHE=1): the authenticated account is
+  kept in memory per hashed credentials for up to 55 minutes
 
 Deployment:
 -----------
@@ -23,20 +27,532 @@ gcloud functions deploy bmw_api_stateless \
 
 Requirements:
 -------------
+python>=3.11 (asyncio.timeout)
 bimmer-connected>=0.14.0
 flask>=2.0.0
 functions-framework>=3.0.0
+orjson>=3.0.0
+msgspec>=0.18.0
 """
 
 import asyncio
-import traceback
-import json
+import hashlib
+import logging
+import operator
+import os
+import re
+import threading
+import time
+import orjson
+import msgspec
 import functions_framework
-from flask import jsonify, Response
 from bimmer_connected.account import MyBMWAccount
 from bimmer_connected.api.regions import Regions
+from bimmer_connected.models import MyBMWAPIError, MyBMWAuthError, MyBMWQuotaError
 from bimmer_connected.vehicle.remote_services import RemoteServices, Services
 
+# Configure logging (Cloud Logging picks up the records; formatting is skipped when filtered).
+# Per-phase records are DEBUG; each successful request logs a single INFO record.
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
+# On Cloud Functions (K_SERVICE is set), build and discard one account at import so the
+# first request does not pay for resolving bimmer_connected's account/auth setup; the
+# vehicle submodules (fuel_and_battery, doors_windows, location, reports) are already
+# imported by bimmer_connected.account. No network call is made.
+if os.getenv("K_SERVICE"):
+    try:
+        MyBMWAccount("warmup", "warmup", Regions.REST_OF_WORLD, hcaptcha_token="warmup")
+    except Exception as e:
+        logger.debug("Account warm-up skipped: %s", e)
+
+# 🔹 Response Helpers
+
+# Fields every request must carry (batch entries carry their own WKN)
+_REQUIRED_FIELDS = ("email", "password", "wkn", "hcaptcha")
+_BATCH_REQUIRED_FIELDS = ("email", "password", "hcaptcha")
+
+class BatchItem(msgspec.Struct):
+    """One {"wkn", "action"} entry of a batch request"""
+    wkn: str
+    action: str = "default"
+
+class BmwRequest(msgspec.Struct):
+    """Request body; decoding parses and type-checks every field in one pass.
+    Required fields default to "" so missing and empty ones are reported together."""
+    email: str = ""
+    password: str = ""
+    wkn: str = ""
+    hcaptcha: str = ""
+    action: str | list[str] = "default"
+    batch: list[BatchItem] | None = None
+
+# OPTIONS preflight reply, built once at import; browsers cache it for 24h
+_PREFLIGHT_RESPONSE = ("", 204, {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST",
+    "Access-Control-Allow-Headers": "Content-Type",
+    "Access-Control-Max-Age": "86400",
+})
+
+# JSON response headers (CORS on every reply)
+_JSON_HEADERS = {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}
+
+def _orjson_default(obj):
+    """Serialize bimmer_connected's NamedTuple values (e.g. ValueWithUnit) as lists like stdlib json"""
+    if isinstance(obj, tuple):
+        return list(obj)
+    raise TypeError
+
+def _json(obj, status=200, headers=_JSON_HEADERS):
+    """Build a Flask response tuple with an orjson-encoded body"""
+    return (orjson.dumps(obj, default=_orjson_default), status, headers)
+
+def _quota_response(quota):
+    """429 response for a parsed BMW quota error, with Retry-After when known"""
+    headers = _JSON_HEADERS
+    if quota.get("retry_after"):
+        headers = {**_JSON_HEADERS, "Retry-After": str(quota["retry_after"])}
+    return _json(quota, 429, headers)
+
+# Static parts of the error replies, merged with the per-request details
+_INVALID_CLIENT_HINTS = (
+    "hCaptcha token expired (they expire after 2 minutes)",
+    "hCaptcha token already used (they're single-use)",
+    "Wrong region selected (try NORTH_AMERICA or CHINA)",
+    "Invalid credentials",
+)
+_INVALID_CLIENT_RESPONSE = {
+    "error": "Authentication failed",
+    "hint": "hCaptcha token may be expired or already used. Generate a new token.",
+    "possible_causes": _INVALID_CLIENT_HINTS,
+}
+_AUTH_FAILED_RESPONSE = {
+    "error": "Authentication failed",
+    "hint": "Check email, password, and hCaptcha token validity",
+}
+_VEHICLE_FAILED_RESPONSE = {"error": "Vehicle operation failed"}
+_BMW_API_FAILED_RESPONSE = {
+    "error": "BMW API request failed",
+    "hint": "BMW servers returned an error. Please try again later.",
+}
+_REQUEST_FAILED_RESPONSE = {
+    "error": "Request processing failed",
+    "authentication_method": "stateless_hcaptcha",
+}
+
+# 🔹 Quota Error Parsing
+
+# Substrings that mark a BMW call volume quota error (matched against the lowercased message)
+_QUOTA_INDICATORS = (
+    "out of call volume quota",
+    "quota will be replenished",
+    "quota limit exceeded",
+    "too many requests",
+    "429",
+)
+_QUOTA_INDICATOR_RE = re.compile("|".join(map(re.escape, _QUOTA_INDICATORS)))
+_QUOTA_TIME_RE = re.compile(r"(?:replenished in|retry in|wait|after)\s*(\d{1,2}):(\d{2}):(\d{2})")
+_QUOTA_SIMPLE_RE = re.compile(r"(\d+)\s*(second|minute|hour)s?")
+_UNIT_SECONDS = {"second": 1, "minute": 60, "hour": 3600}
+
+def _parse_quota_error(error_message, is_quota=False):
+    """
+    Recognise a BMW quota error and extract how long to wait.
+    Returns {"error", "message", "retry_after", "details"} or None for other errors;
+    retry_after is in seconds, or None when BMW did not say.
+    is_quota skips the message check for errors already typed as quota errors.
+    """
+    lowered = error_message.lower()
+    if not is_quota and not _QUOTA_INDICATOR_RE.search(lowered):
+        return None
+    
+    retry_after = None
+    match = _QUOTA_TIME_RE.search(lowered)
+    if match:
+        hours, minutes, seconds = map(int, match.groups())
+        retry_after = hours * 3600 + minutes * 60 + seconds
+    else:
+        match = _QUOTA_SIMPLE_RE.search(lowered)
+        if match:
+            retry_after = int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+    
+    return {
+        "error": "Rate limited",
+        "message": "BMW API quota limit exceeded. Please wait before retrying.",
+        "retry_after": retry_after,
+        "details": error_message
+    }
+
+# 🔹 In-Memory Auth Cache (process-local, dies with the container)
+
+AUTH_CACHE_TTL = 110  # seconds, under the ~2 minute hCaptcha token lifetime
+_AUTH_CACHE = {}  # cache key -> (expires_at, MyBMWAccount, vehicles_fetched_at, refresh lock)
+_AUTH_CACHE_LOCK = threading.Lock()  # handler threads share the cache
+
+# Opt-in: keep the account per credentials for the OAuth token lifetime, so later
+# requests on a warm container skip hCaptcha login. Off by default (stateless).
+ALLOW_WARM_CACHE = os.getenv("BMW_ALLOW_WARM_CACHE", "").lower() in ("1", "true", "yes")
+WARM_CACHE_TTL = 3300  # seconds, under the one hour BMW access token lifetime
+VEHICLES_STALE_AFTER = 30  # seconds before a cached account refetches its vehicles
+
+def _credentials_key(email, password):
+    """Hash credentials so the warm cache key never holds them in plain text"""
+    return hashlib.blake2b(f"{email}\0{password}".encode(), digest_size=16).hexdigest()
+
+def _get_cached_account(key):
+    """Return (account, vehicles_fetched_at, refresh lock) for a still fresh cache entry, else None"""
+    with _AUTH_CACHE_LOCK:
+        entry = _AUTH_CACHE.get(key)
+        if entry is None:
+            return None
+        expires_at, account, fetched_at, refresh_lock = entry
+        if expires_at < time.monotonic():
+            _AUTH_CACHE.pop(key, None)
+            return None
+    return account, fetched_at, refresh_lock
+
+def _evict_accounts(*keys):
+    """Forget cached accounts whose BMW session was rejected"""
+    with _AUTH_CACHE_LOCK:
+        for key in keys:
+            _AUTH_CACHE.pop(key, None)
+
+def _store_account(key, account, fetched_at, refresh_lock, ttl):
+    """Remember an authenticated account and drop expired entries"""
+    now = time.monotonic()
+    with _AUTH_CACHE_LOCK:
+        for stale in [k for k, (expires_at, *_) in _AUTH_CACHE.items() if expires_at < now]:
+            _AUTH_CACHE.pop(stale, None)
+        _AUTH_CACHE[key] = (now + ttl, account, fetched_at, refresh_lock)
+
+# Background event loop shared by all requests; handler threads submit
+# coroutines to it instead of creating and closing a loop per request
+_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_LOOP.run_forever, name="bmw-api-loop", daemon=True).start()
+
+# Bound concurrent BMW OAuth + vehicle list fetches per container (only awaited on _LOOP)
+BMW_AUTH_CONCURRENCY = 8
+_BMW_AUTH_SEM = asyncio.Semaphore(BMW_AUTH_CONCURRENCY)
+
+# 🔹 Action Dispatch Table
+
+# Static result templates, shared by reference: responses are only serialized, never mutated
+_LOCATION_UNAVAILABLE = {"status": "unavailable", "message": "Location data not available"}
+_LOCK_STATUS_UNAVAILABLE = {"status": "unavailable", "message": "Lock status not available"}
+_LOCK_STATE_UNAVAILABLE = {"status": "unavailable", "message": "Lock state information not available"}
+_ERROR_TEMPLATE = {"status": "error", "message": None}
+
+# (type, fields) -> (present fields, attrgetter); the bimmer_connected model types are fixed
+# per deployed version, so which attributes exist is probed once per type
+_FIELD_READERS = {}
+
+def _read_fields(obj, fields):
+    """Read the fields obj's type has, with a single attrgetter after a one-time probe"""
+    key = (type(obj), fields)
+    reader = _FIELD_READERS.get(key)
+    if reader is None:
+        present = tuple(field for field in fields if hasattr(obj, field))
+        reader = _FIELD_READERS[key] = (present, operator.attrgetter(*present) if present else None)
+    present, getter = reader
+    if getter is None:
+        return {}
+    values = getter(obj)
+    return dict(zip(present, values if len(present) > 1 else (values,)))
+
+_FUEL_FIELDS = (
+    "remaining_fuel",
+    "remaining_fuel_percent",
+    "remaining_range_fuel",
+    "remaining_range_electric",
+    "remaining_range_total",
+)
+_MILEAGE_FIELDS = ("value", "unit")
+
+def _fuel_result(vehicle):
+    return {**dict.fromkeys(_FUEL_FIELDS), **_read_fields(vehicle.fuel_and_battery, _FUEL_FIELDS)}
+
+def _location_result(vehicle):
+    location = vehicle.location
+    if location and location.location:
+        return {
+            "latitude": location.location.latitude,
+            "longitude": location.location.longitude,
+            "heading": getattr(location, "heading", None),
+            # orjson writes datetimes as RFC 3339 strings itself
+            "timestamp": getattr(location, "vehicle_update_timestamp", None),
+        }
+    return _LOCATION_UNAVAILABLE
+
+# Bound method lookup done in C instead of a Python-level comprehension
+_msg_to_dict = operator.methodcaller("to_dict")
+
+def _check_control_result(vehicle):
+    report = vehicle.check_control_message_report
+    return {
+        "has_check_control_messages": report.has_check_control_messages if report else False,
+        "messages": list(map(_msg_to_dict, report.messages)) if report and report.messages else []
+    }
+
+def _mileage_result(vehicle):
+    mileage = vehicle.mileage
+    fields = _read_fields(mileage, _MILEAGE_FIELDS)
+    return {
+        "value": fields.get("value", mileage),
+        "unit": fields.get("unit", "km")
+    }
+
+def _lock_state(vehicle):
+    """Single read of vehicle.doors_windows.lock_state.value (None when unavailable)"""
+    doors_windows = getattr(vehicle, "doors_windows", None)
+    return getattr(getattr(doors_windows, "lock_state", None), "value", None) if doors_windows else None
+
+_LOCK_RESPONSE = {
+    "LOCKED": {"is_locked": True, "state": "locked", "message": "Vehicle is locked"},
+    "UNLOCKED": {"is_locked": False, "state": "unlocked", "message": "Vehicle is unlocked"},
+}
+
+def _lock_status_result(vehicle):
+    lock_state = _lock_state(vehicle)
+    if lock_state is None:
+        return _LOCK_STATUS_UNAVAILABLE
+    return {"lock_state": lock_state, "message": "Lock status retrieved successfully"}
+
+def _is_locked_result(vehicle):
+    lock_state = _lock_state(vehicle)
+    if lock_state is None:
+        return _LOCK_STATE_UNAVAILABLE
+    return _LOCK_RESPONSE.get(lock_state) or {
+        "is_locked": None,
+        "state": lock_state,
+        "message": f"Vehicle in intermediate state: {lock_state}"
+    }
+
+# Remote services: action -> (coroutine factory, timeout in seconds, success message, timeout message)
+_REMOTE_ACTIONS = {
+    "lock": (lambda rs: rs.trigger_remote_door_lock(), 90, "Door lock command sent successfully",
+             "Locking operation timed out after 90 seconds"),
+    "unlock": (lambda rs: rs.trigger_remote_door_unlock(), 90, "Door unlock command sent successfully",
+               "Unlocking operation timed out after 90 seconds"),
+    "flash": (lambda rs: rs.trigger_remote_light_flash(), 30, "Light flash command sent successfully",
+              "Flash operation timed out"),
+    "ac": (lambda rs: rs.trigger_remote_service(Services.AIR_CONDITIONING), 60, "Air conditioning command sent successfully",
+           "AC operation timed out"),
+}
+
+# Data getters: action -> sync formatter of the already fetched vehicle state
+_DATA_ACTIONS = {
+    "fuel": _fuel_result,
+    "location": _location_result,
+    "check_control": _check_control_result,
+    "mileage": _mileage_result,
+    "lock_status": _lock_status_result,
+    "is_locked": _is_locked_result,
+}
+
+# Listed in the reply to an unknown action; built once, orjson encodes tuples as arrays
+_AVAILABLE_ACTIONS = (*_REMOTE_ACTIONS, *_DATA_ACTIONS)
+
+_UNKNOWN_ACTION_RESULT = {
+    "status": "info",
+    "message": "No valid action specified. Vehicle details returned.",
+    "available_actions": _AVAILABLE_ACTIONS
+}
+# Constant per deployment: serialize it once and splice the bytes into responses
+# (orjson.Fragment, orjson>=3.9; older orjson encodes the dict each time)
+if hasattr(orjson, "Fragment"):
+    _UNKNOWN_ACTION_RESULT = orjson.Fragment(orjson.dumps(_UNKNOWN_ACTION_RESULT))
+
+# Per-action timeout replies, built once for every action that has a deadline
+_TIMEOUT_RESULTS = {
+    name: {"status": "timeout", "message": timeout_message}
+    for name, (_, _, _, timeout_message) in _REMOTE_ACTIONS.items()
+}
+
+# 🔹 Vehicle Fetch and Action Execution
+
+async def _execute_action(vehicle, remote_services, action):
+    """
+    Execute one action against an already fetched vehicle.
+    Failures are reported in the returned result rather than raised.
+    """
+    getter = _DATA_ACTIONS.get(action)
+    if getter is not None:
+        logger.debug("Retrieving %s", action)
+        try:
+            return getter(vehicle)
+        except Exception as e:
+            return dict(_ERROR_TEMPLATE, message=f"{action} operation failed: {str(e)}")
+    
+    entry = _REMOTE_ACTIONS.get(action)
+    if entry is None:
+        logger.debug("No specific action requested or unknown action: %s", action)
+        return _UNKNOWN_ACTION_RESULT
+    
+    factory, tmo, message, _ = entry
+    logger.debug("Executing action: %s", action)
+    try:
+        async with asyncio.timeout(tmo):
+            result = await factory(remote_services)
+        return {
+            "status": result.state.value if result and hasattr(result, "state") else "Unknown",
+            "message": message
+        }
+    except asyncio.TimeoutError:
+        return _TIMEOUT_RESULTS[action]
+    except Exception as e:
+        return dict(_ERROR_TEMPLATE, message=f"{action} operation failed: {str(e)}")
+
+async def _fetch_vehicles(account):
+    """
+    Fetch vehicles from BMW servers with timeout (this also authenticates).
+    Returns None on success, otherwise the error body and HTTP status code.
+    """
+    # Held only for auth + vehicle list, released before any remote service call
+    if _BMW_AUTH_SEM.locked():
+        logger.debug("Waiting for a free BMW auth slot")
+    await _BMW_AUTH_SEM.acquire()
+    logger.debug("Fetching vehicle data")
+    try:
+        async with asyncio.timeout(60):
+            await account.get_vehicles()
+        logger.debug("Found %d vehicles", len(account.vehicles))
+    except asyncio.TimeoutError:
+        logger.warning("Vehicle fetch timed out")
+        return {
+            "error": "BMW servers took too long to respond",
+            "hint": "Please try again. BMW servers may be slow.",
+            "timeout": "60 seconds"
+        }, 504
+    except Exception as e:
+        logger.error("Failed to fetch vehicles: %s", e)
+        quota = _parse_quota_error(str(e), isinstance(e, MyBMWQuotaError))
+        if quota:
+            return quota, 429
+        if isinstance(e, MyBMWAuthError):
+            return {**_AUTH_FAILED_RESPONSE, "details": str(e)}, 401
+        return {
+            "error": "Failed to fetch vehicles",
+            "details": str(e),
+            "hint": "Check credentials and hCaptcha token"
+        }, 500
+    finally:
+        _BMW_AUTH_SEM.release()
+    return None
+
+async def _run_batch_item(account, item):
+    """Run one {"wkn", "action"} batch entry against the already fetched vehicles"""
+    wkn = item.wkn
+    action = item.action
+    vehicle = account.get_vehicle(wkn)
+    if not vehicle:
+        return {"wkn": wkn, "action": action, "error": f"Vehicle with WKN '{wkn}' not found"}
+    return {
+        "wkn": wkn,
+        "vin": vehicle.vin,
+        "action": action,
+        "action_result": await _execute_action(vehicle, RemoteServices(vehicle), action)
+    }
+
+async def _run_vehicle_items(account, items):
+    """Run one vehicle's batch entries in order, since BMW runs one remote command per vehicle at a time"""
+    results = []
+    for item in items:
+        try:
+            results.append(await _run_batch_item(account, item))
+        except Exception as e:
+            results.append(e)
+    return results
+
+async def _refresh_vehicles(account, refresh_lock):
+    """Fetch vehicles, one refresh at a time per (possibly shared, cached) account"""
+    async with refresh_lock:
+        return await _fetch_vehicles(account)
+
+async def _run_batch(account, batch, refresh_lock, refresh=True):
+    """
+    Authenticate and fetch vehicles once (unless a cached account is still fresh),
+    then run the batch entries: different vehicles concurrently, each vehicle's in order.
+    Returns the response body and HTTP status code.
+    """
+    if refresh:
+        fetch_error = await _refresh_vehicles(account, refresh_lock)
+        if fetch_error:
+            return fetch_error
+    
+    # Group entry positions by WKN so results keep the request order
+    by_wkn = {}
+    for index, item in enumerate(batch):
+        by_wkn.setdefault(item.wkn, []).append(index)
+    grouped = await asyncio.gather(
+        *(_run_vehicle_items(account, [batch[i] for i in indices]) for indices in by_wkn.values())
+    )
+    results = [None] * len(batch)
+    for indices, group_results in zip(by_wkn.values(), grouped):
+        for index, result in zip(indices, group_results):
+            results[index] = result
+    logger.info("request completed: batch_size=%d", len(batch))
+    return {
+        "results": [
+            {"error": str(result)} if isinstance(result, Exception) else result
+            for result in results
+        ],
+        "authentication_method": "stateless_hcaptcha"
+    }, 200
+
+async def _run_stateless(account, wkn, action, refresh_lock, refresh=True):
+    """
+    Fetch vehicles (unless a cached account is still fresh) and execute the requested action.
+    Returns the response body and HTTP status code.
+    """
+    # ✅ Fetch vehicles from BMW servers with timeout
+    if refresh:
+        fetch_error = await _refresh_vehicles(account, refresh_lock)
+        if fetch_error:
+            return fetch_error
+    
+    # Get specific vehicle by WKN
+    vehicle = account.get_vehicle(wkn)
+    
+    if not vehicle:
+        return {
+            "error": f"Vehicle with WKN '{wkn}' not found",
+            "available_vehicles": tuple(v.vin for v in account.vehicles)
+        }, 404
+    
+    logger.debug("Found vehicle: %s (WKN: %s)", vehicle.name, wkn)
+    
+    # Initialize RemoteServices for remote commands
+    remote_services = RemoteServices(vehicle)
+
+    # ✅ Handle Remote Actions Based on Request
+    if isinstance(action, list):
+        # Multi-action: one login serves every action, results keyed by action name.
+        # Data getters only read the fetched vehicle; the (at most one) remote service is awaited.
+        action_result = {}
+        for name in dict.fromkeys(action):
+            try:
+                action_result[name] = await _execute_action(vehicle, remote_services, name)
+            except Exception as e:
+                action_result[name] = {"status": "error", "message": str(e)}
+    else:
+        action_result = await _execute_action(vehicle, remote_services, action)
+
+    # Build the response with vehicle information and the action result in one literal
+    response_data = {
+        "brand": vehicle.brand,
+        "vehicle_name": vehicle.name,
+        "vin": vehicle.vin,
+        "wkn": wkn,
+        "model": getattr(vehicle, "model", "Unknown"),
+        "action_result": action_result,
+        "authentication_method": "stateless_hcaptcha",
+    }
+    
+    # The one INFO record per request; the default formatter drops extra=, so the fields go in the message
+    logger.info("request completed: vehicle=%s action=%s", vehicle.name, action)
+    return response_data, 200
+
 # 🔹 Main Cloud Function Handler - Stateless Version
 
 @functions_framework.http
@@ -60,395 +576,149 @@ def bmw_api(request):
         "hcaptcha": "hcaptcha_token",
         "action": "lock|unlock|flash|ac|fuel|location|mileage|lock_status|is_locked"
     }
+    
+    "action" may also be a list (e.g. ["fuel", "location", "mileage"]) with at most one
+    remote service; the actions run one after another and action_result is keyed by
+    action name.
+    
+    A "batch" list of {"wkn": ..., "action": ...} objects may replace "wkn"/"action":
+    one authentication and vehicle fetch serves every entry, entries for the same
+    vehicle run one after another, and the response holds one result per entry
+    under "results".
     """
     
     # ✅ Handle CORS (Preflight Requests)
     if request.method == "OPTIONS":
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST",
-            "Access-Control-Allow-Headers": "Content-Type",
-        }
-        return ("", 204, headers)
+        return _PREFLIGHT_RESPONSE
 
     # ✅ Parse and validate ALL required fields (including hCaptcha)
     try:
-        data = request.get_json()
-        
-        # Validate all required fields are present
-        required_fields = ["email", "password", "wkn", "hcaptcha"]
-        missing_fields = [field for field in required_fields if field not in data or not data[field]]
-        
-        if missing_fields:
-            return jsonify({
-                "error": f"Missing required fields: {', '.join(missing_fields)}",
-                "required": required_fields
-            }), 400
-            
-    except Exception as e:
-        return jsonify({
+        data = msgspec.json.decode(request.get_data(), type=BmwRequest)
+    except msgspec.ValidationError as e:
+        return _json({
+            "error": "Invalid request",
+            "details": str(e),
+            "required": _REQUIRED_FIELDS
+        }, 400)
+    except msgspec.DecodeError as e:
+        return _json({
             "error": "Invalid JSON format",
             "details": str(e)
-        }), 400
+        }, 400)
+    
+    # Validate all required fields are non-empty (batch entries carry their own WKN)
+    batch = data.batch
+    required_fields = _BATCH_REQUIRED_FIELDS if batch else _REQUIRED_FIELDS
+    
+    # Short-circuit on the happy path; only list the missing fields on failure
+    if not all(getattr(data, field) for field in required_fields):
+        missing_fields = [field for field in required_fields if not getattr(data, field)]
+        return _json({
+            "error": f"Missing required fields: {', '.join(missing_fields)}",
+            "required": required_fields
+        }, 400)
 
     # Extract request parameters
-    provided_email = data["email"]
-    provided_password = data["password"]
-    wkn = data["wkn"]
-    hcaptcha_token = data["hcaptcha"]
-    action = data.get("action", "default")
-
-    # ✅ ALWAYS authenticate fresh with hCaptcha (no token storage/reuse)
-    print(f"🔑 Stateless authentication for {provided_email} with hCaptcha...")
-    print(f"📝 hCaptcha token (first 50 chars): {hcaptcha_token[:50]}...")
+    provided_email = data.email
+    provided_password = data.password
+    wkn = data.wkn
+    hcaptcha_token = data.hcaptcha
+    action = data.action
     
-    try:
-        # Create new account instance with hCaptcha for fresh authentication
-        # Note: REST_OF_WORLD is typically used for European accounts
-        account = MyBMWAccount(
-            provided_email, 
-            provided_password, 
-            Regions.REST_OF_WORLD, 
-            hcaptcha_token=hcaptcha_token
-        )
-        
-        # ✅ Fetch vehicles from BMW servers with timeout
-        print("🚗 Fetching vehicle data...")
-        try:
-            await_task = asyncio.wait_for(
-                account.get_vehicles(),
-                timeout=60
-            )
-            asyncio.run(await_task)
-            print(f"✅ Found {len(account.vehicles)} vehicles")
-        except asyncio.TimeoutError:
-            print("⏱️ Vehicle fetch timed out")
-            return jsonify({
-                "error": "BMW servers took too long to respond",
-                "hint": "Please try again. BMW servers may be slow.",
-                "timeout": "60 seconds"
-            }), 504
-        except Exception as e:
-            print(f"❌ Failed to fetch vehicles: {str(e)}")
-            return jsonify({
-                "error": "Failed to fetch vehicles",
-                "details": str(e),
-                "hint": "Check credentials and hCaptcha token"
-            }), 500
-        
-        # Get specific vehicle by WKN
-        vehicle = account.get_vehicle(wkn)
-        
-        if not vehicle:
-            return jsonify({
-                "error": f"Vehicle with WKN '{wkn}' not found",
-                "available_vehicles": [v.vin for v in account.vehicles]
-            }), 404
-        
-        print(f"🚙 Found vehicle: {vehicle.name} (WKN: {wkn})")
-        
-        # Initialize RemoteServices for remote commands
-        remote_services = RemoteServices(vehicle)
-
-        # Build base response with vehicle information
-        response_data = {
-            "brand": vehicle.brand,
-            "vehicle_name": vehicle.name,
-            "vin": vehicle.vin,
-            "wkn": wkn,
-            "model": getattr(vehicle, "model", "Unknown"),
-        }
+    # A multi-action request may carry any data getters but only one remote service,
+    # since BMW runs one remote command per vehicle at a time
+    if isinstance(action, list):
+        remote = [name for name in dict.fromkeys(action) if name in _REMOTE_ACTIONS]
+        if len(remote) > 1:
+            return _json({
+                "error": "Only one remote service action is allowed per request",
+                "remote_actions": remote
+            }, 400)
 
-        # Initialize action result
-        action_result = None
+    # Whether this request sends a remote command (cached vehicle state is then outdated)
+    if batch:
+        ran_remote = any(item.action in _REMOTE_ACTIONS for item in batch)
+    else:
+        ran_remote = any(name in _REMOTE_ACTIONS for name in (action if isinstance(action, list) else (action,)))
 
-        # ✅ Handle Remote Actions Based on Request
+    # ✅ Authenticate with hCaptcha; a token already redeemed by this container reuses its session,
+    # and with BMW_ALLOW_WARM_CACHE any earlier login with the same credentials does too
+    credentials_key = _credentials_key(provided_email, provided_password)
+    auth_key = (credentials_key, hcaptcha_token)
+    warm_key = credentials_key if ALLOW_WARM_CACHE else None
+    
+    try:
+        cached = _get_cached_account(auth_key) or (warm_key and _get_cached_account(warm_key))
+        if cached:
+            account, fetched_at, refresh_lock = cached
+            logger.debug("stateless_auth_reused: %s", provided_email)
+        else:
+            fetched_at = 0.0
+            # Created here, first awaited on _LOOP (asyncio.Lock binds its loop lazily)
+            refresh_lock = asyncio.Lock()
+            logger.debug("stateless_auth: %s", provided_email)
+            logger.debug("hCaptcha token (first 50 chars): %s...", hcaptcha_token[:50])
+            # Create new account instance with hCaptcha for fresh authentication
+            # Note: REST_OF_WORLD is typically used for European accounts
+            account = MyBMWAccount(
+                provided_email, 
+                provided_password, 
+                Regions.REST_OF_WORLD, 
+                hcaptcha_token=hcaptcha_token
+            )
         
-        if action == "lock":
-            print("🔒 Executing remote door lock...")
-            try:
-                result = asyncio.run(
-                    asyncio.wait_for(
-                        remote_services.trigger_remote_door_lock(), 
-                        timeout=90
-                    )
-                )
-                action_result = {
-                    "status": result.state.value if result and hasattr(result, "state") else "Unknown",
-                    "message": "Door lock command sent successfully"
-                }
-            except asyncio.TimeoutError:
-                action_result = {
-                    "status": "timeout",
-                    "message": "Locking operation timed out after 90 seconds"
-                }
-            except Exception as e:
-                action_result = {
-                    "status": "error",
-                    "message": f"Lock operation failed: {str(e)}"
-                }
-                
-        elif action == "unlock":
-            print("🔓 Executing remote door unlock...")
-            try:
-                result = asyncio.run(
-                    asyncio.wait_for(
-                        remote_services.trigger_remote_door_unlock(), 
-                        timeout=90
-                    )
-                )
-                action_result = {
-                    "status": result.state.value if result and hasattr(result, "state") else "Unknown",
-                    "message": "Door unlock command sent successfully"
-                }
-            except asyncio.TimeoutError:
-                action_result = {
-                    "status": "timeout",
-                    "message": "Unlocking operation timed out after 90 seconds"
-                }
-            except Exception as e:
-                action_result = {
-                    "status": "error",
-                    "message": f"Unlock operation failed: {str(e)}"
-                }
-                
-        elif action == "flash":
-            print("💡 Executing remote light flash...")
-            try:
-                result = asyncio.run(
-                    asyncio.wait_for(
-                        remote_services.trigger_remote_light_flash(),
-                        timeout=30
-                    )
-                )
-                action_result = {
-                    "status": result.state.value if result and hasattr(result, "state") else "Unknown",
-                    "message": "Light flash command sent successfully"
-                }
-            except asyncio.TimeoutError:
-                action_result = {
-                    "status": "timeout",
-                    "message": "Flash operation timed out"
-                }
-            except Exception as e:
-                action_result = {
-                    "status": "error",
-                    "message": f"Flash operation failed: {str(e)}"
-                }
-            
-        elif action == "ac":
-            print("❄️ Executing remote air conditioning activation...")
-            try:
-                result = asyncio.run(
-                    asyncio.wait_for(
-                        remote_services.trigger_remote_service(Services.AIR_CONDITIONING),
-                        timeout=60
-                    )
-                )
-                action_result = {
-                    "status": result.state.value if result and hasattr(result, "state") else "Unknown",
-                    "message": "Air conditioning command sent successfully"
-                }
-            except asyncio.TimeoutError:
-                action_result = {
-                    "status": "timeout",
-                    "message": "AC operation timed out"
-                }
-            except Exception as e:
-                action_result = {
-                    "status": "error",
-                    "message": f"AC operation failed: {str(e)}"
-                }
-            
-        elif action == "fuel":
-            print("⛽ Retrieving fuel and battery information...")
-            try:
-                fuel_and_battery = vehicle.fuel_and_battery
-                action_result = {
-                    "remaining_fuel": getattr(fuel_and_battery, "remaining_fuel", None),
-                    "remaining_fuel_percent": getattr(fuel_and_battery, "remaining_fuel_percent", None),
-                    "remaining_range_fuel": getattr(fuel_and_battery, "remaining_range_fuel", None),
-                    "remaining_range_electric": getattr(fuel_and_battery, "remaining_range_electric", None),
-                    "remaining_range_total": getattr(fuel_and_battery, "remaining_range_total", None),
-                }
-            except Exception as e:
-                action_result = {
-                    "status": "error",
-                    "message": f"Failed to retrieve fuel data: {str(e)}"
-                }
-            
-        elif action == "location":
-            print("📍 Retrieving vehicle location...")
-            try:
-                location = vehicle.location
-                if location and location.location:
-                    action_result = {
-                        "latitude": location.location.latitude,
-                        "longitude": location.location.longitude,
-                        "heading": getattr(location, "heading", None),
-                        "timestamp": location.vehicle_update_timestamp.isoformat() if hasattr(location, "vehicle_update_timestamp") and location.vehicle_update_timestamp else None,
-                    }
-                else:
-                    action_result = {
-                        "status": "unavailable",
-                        "message": "Location data not available"
-                    }
-            except Exception as e:
-                action_result = {
-                    "status": "error",
-                    "message": f"Failed to retrieve location: {str(e)}"
-                }
-            
-        elif action == "check_control":
-            print("🔍 Retrieving check control messages...")
-            try:
-                report = vehicle.check_control_message_report
-                action_result = {
-                    "has_check_control_messages": report.has_check_control_messages if report else False,
-                    "messages": [msg.to_dict() for msg in report.messages] if report and report.messages else []
-                }
-            except Exception as e:
-                action_result = {
-                    "status": "error",
-                    "message": f"Failed to retrieve check control messages: {str(e)}"
-                }
-            
-        elif action == "mileage":
-            print("📏 Retrieving mileage information...")
-            try:
-                mileage = vehicle.mileage
-                action_result = {
-                    "value": mileage.value if hasattr(mileage, "value") else mileage,
-                    "unit": mileage.unit if hasattr(mileage, "unit") else "km"
-                }
-            except Exception as e:
-                action_result = {
-                    "status": "error",
-                    "message": f"Failed to retrieve mileage: {str(e)}"
-                }
-            
-        elif action == "lock_status":
-            print("🔍 Retrieving detailed door lock status...")
-            try:
-                if hasattr(vehicle, "doors_windows") and vehicle.doors_windows:
-                    lock_state = vehicle.doors_windows.lock_state
-                    action_result = {
-                        "lock_state": lock_state.value if lock_state and hasattr(lock_state, "value") else "Unknown",
-                        "message": "Lock status retrieved successfully"
-                    }
-                else:
-                    action_result = {
-                        "status": "unavailable",
-                        "message": "Lock status not available"
-                    }
-            except Exception as e:
-                action_result = {
-                    "status": "error",
-                    "message": f"Failed to retrieve lock status: {str(e)}"
-                }
-            
-        elif action == "is_locked":
-            print("🔐 Checking if vehicle is locked...")
-            try:
-                if hasattr(vehicle, "doors_windows") and vehicle.doors_windows:
-                    lock_state = vehicle.doors_windows.lock_state
-                    if lock_state and hasattr(lock_state, "value"):
-                        if lock_state.value == "LOCKED":
-                            action_result = {
-                                "is_locked": True,
-                                "state": "locked",
-                                "message": "Vehicle is locked"
-                            }
-                        elif lock_state.value == "UNLOCKED":
-                            action_result = {
-                                "is_locked": False,
-                                "state": "unlocked",
-                                "message": "Vehicle is unlocked"
-                            }
-                        else:
-                            action_result = {
-                                "is_locked": None,
-                                "state": lock_state.value,
-                                "message": f"Vehicle in intermediate state: {lock_state.value}"
-                            }
-                    else:
-                        action_result = {
-                            "status": "unknown",
-                            "message": "Unable to determine lock state"
-                        }
-                else:
-                    action_result = {
-                        "status": "unavailable",
-                        "message": "Lock state information not available"
-                    }
-            except Exception as e:
-                action_result = {
-                    "status": "error",
-                    "message": f"Failed to check lock state: {str(e)}"
-                }
-                
+        # ✅ Fetch vehicles and run the action(s) on the shared background loop
+        refresh = time.monotonic() - fetched_at > VEHICLES_STALE_AFTER
+        if batch:
+            coro = _run_batch(account, batch, refresh_lock, refresh)
         else:
-            print(f"ℹ️ No specific action requested or unknown action: {action}")
-            action_result = {
-                "status": "info",
-                "message": "No valid action specified. Vehicle details returned.",
-                "available_actions": [
-                    "lock", "unlock", "flash", "ac", "fuel", 
-                    "location", "check_control", "mileage", 
-                    "lock_status", "is_locked"
-                ]
-            }
-
-        # Add action result to response
-        response_data["action_result"] = action_result
-        response_data["authentication_method"] = "stateless_hcaptcha"
-
-        # Set CORS headers for response
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Content-Type": "application/json"
-        }
+            coro = _run_stateless(account, wkn, action, refresh_lock, refresh)
+        response_data, status_code = asyncio.run_coroutine_threadsafe(coro, _LOOP).result()
+        if status_code != 200:
+            # Only an auth failure invalidates the session; after e.g. a 404 for a wrong
+            # WKN the (already redeemed) token's session stays usable for a retry
+            if status_code == 401:
+                _evict_accounts(auth_key, warm_key)
+            if status_code == 429:
+                return _quota_response(response_data)
+            return _json(response_data, status_code)
+        # A remote service changes the vehicle state, so the next request must refetch
+        if ran_remote:
+            fetched_at = 0.0
+        elif refresh:
+            fetched_at = time.monotonic()
+        _store_account(auth_key, account, fetched_at, refresh_lock, AUTH_CACHE_TTL)
+        if warm_key:
+            _store_account(warm_key, account, fetched_at, refresh_lock, WARM_CACHE_TTL)
         
-        print(f"✅ Request completed successfully for {vehicle.name}")
-        return (jsonify(response_data), 200, headers)
+        return _json(response_data)
 
     except Exception as e:
         # Handle authentication or other errors
         error_message = str(e)
-        print(f"❌ Error: {error_message}")
-        print(f"Traceback: {traceback.format_exc()}")
+        # Walk the frames only when the caller asked for them (traceback is only needed here)
+        tb = None
+        if request.args.get('debug'):
+            import traceback
+            tb = traceback.format_exc()
+        logger.error("bmw_error: %s: %s", type(e).__name__, error_message, exc_info=tb is not None)
         
-        # Check for specific error types
-        if "invalid_client" in error_message.lower():
-            return jsonify({
-                "error": "Authentication failed", 
-                "details": error_message,
-                "hint": "hCaptcha token may be expired or already used. Generate a new token.",
-                "possible_causes": [
-                    "hCaptcha token expired (they expire after 2 minutes)",
-                    "hCaptcha token already used (they're single-use)",
-                    "Wrong region selected (try NORTH_AMERICA or CHINA)",
-                    "Invalid credentials"
-                ]
-            }), 401
-        elif "authentication" in error_message.lower() or "401" in error_message:
-            return jsonify({
-                "error": "Authentication failed",
-                "details": error_message,
-                "hint": "Check email, password, and hCaptcha token validity"
-            }), 401
-        elif "vehicle" in error_message.lower():
-            return jsonify({
-                "error": "Vehicle operation failed",
-                "details": error_message
-            }), 500
+        # Classify by bimmer_connected's exception types first (quota errors before the
+        # other BMW errors); message matching remains for untyped exceptions
+        quota = _parse_quota_error(error_message, isinstance(e, MyBMWQuotaError))
+        if quota:
+            return _quota_response(quota)
+        lowered = error_message.lower()
+        if "invalid_client" in lowered:
+            return _json({**_INVALID_CLIENT_RESPONSE, "details": error_message}, 401)
+        elif isinstance(e, MyBMWAuthError) or "authentication" in lowered or "401" in error_message:
+            return _json({**_AUTH_FAILED_RESPONSE, "details": error_message}, 401)
+        elif isinstance(e, MyBMWAPIError):
+            return _json({**_BMW_API_FAILED_RESPONSE, "details": error_message}, 502)
+        elif "vehicle" in lowered:
+            return _json({**_VEHICLE_FAILED_RESPONSE, "details": error_message}, 500)
         else:
-            return jsonify({
-                "error": "Request processing failed",
-                "details": error_message,
-                "authentication_method": "stateless_hcaptcha",
-                "traceback": traceback.format_exc() if request.args.get('debug') else None
-            }), 500
+            return _json({**_REQUEST_FAILED_RESPONSE, "details": error_message, "traceback": tb}, 500)
 
 
 # For local testing, use: functions-framework --target=bmw_api --debug
\ No newline at end of file
@@ -3,12 +3,190 @@ BMW API Stateless - No OAuth token storage, fresh authentication every request
 Clean implementation using bimmer_connected 0.17.3
 """
 import asyncio
-from flask import request, jsonify
+import msgspec
+import orjson
+from flask import request
 import functions_framework
 from bimmer_connected.account import MyBMWAccount
 from bimmer_connected.api.regions import Regions
 from bimmer_connected.vehicle.remote_services import RemoteServices
 
+# uvloop is optional; when present asyncio.run() uses a libuv-backed loop
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
+# Fields every request must provide (non-empty)
+_REQUIRED_FIELDS = ("email", "password", "wkn", "hcaptcha")
+
+class BmwRequest(msgspec.Struct):
+    """Request body; decoding checks presence and types of every field in one pass"""
+    email: str
+    password: str
+    wkn: str
+    hcaptcha: str
+    action: str = "status"
+
+# CORS preflight reply, built once; Max-Age lets browsers cache it for a day
+_PREFLIGHT_RESPONSE = ("", 204, {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST, GET",
+    "Access-Control-Allow-Headers": "Content-Type",
+    "Access-Control-Max-Age": "86400",
+})
+
+# JSON response headers (CORS on every reply)
+_JSON_HEADERS = {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+
+def _orjson_default(obj):
+    """Serialize bimmer_connected's NamedTuple values (e.g. ValueWithUnit) as lists like stdlib json"""
+    if isinstance(obj, tuple):
+        return list(obj)
+    raise TypeError
+
+def _json(obj, status=200):
+    """Build a Flask response tuple with an orjson-encoded body"""
+    return (orjson.dumps(obj, default=_orjson_default), status, _JSON_HEADERS)
+
+def _missing_fields(details):
+    """400 response for a body without the required stateless fields"""
+    return _json({
+        "error": "Missing required fields",
+        "required": list(_REQUIRED_FIELDS),
+        "details": details,
+        "message": "hCaptcha token is required for every request in stateless mode"
+    }, 400)
+
+# Remote action -> (command name, RemoteServices method, log line, success message)
+_REMOTE_COMMANDS = {
+    "lock": ("lock", "trigger_remote_door_lock", "🔒 Sending lock command...", "Lock command sent successfully"),
+    "unlock": ("unlock", "trigger_remote_door_unlock", "🔓 Sending unlock command...", "Unlock command sent successfully"),
+    "flash": ("flash", "trigger_remote_light_flash", "💡 Sending flash lights command...", "Flash lights command sent successfully"),
+    "climate": ("climate", "trigger_remote_air_conditioning", "❄️ Sending climate control command...", "Climate control command sent successfully"),
+}
+_REMOTE_COMMANDS["ac"] = _REMOTE_COMMANDS["climate"]
+
+async def _process(account, wkn, action):
+    """
+    Fetch vehicles and run the requested action inside one event loop
+    Returns (response body, status code)
+    """
+    # Get vehicles (this triggers authentication)
+    print("🚗 Fetching vehicles...")
+    await account.get_vehicles()
+    
+    # Find target vehicle
+    vehicle = account.get_vehicle(wkn)
+    if not vehicle:
+        return {
+            "error": f"Vehicle {wkn} not found",
+            "available_vehicles": [v.vin for v in account.vehicles]
+        }, 404
+    
+    # Build base response
+    response = {
+        "success": True,
+        "vehicle": {
+            "brand": vehicle.brand,
+            "name": vehicle.name,
+            "vin": vehicle.vin,
+            "model": getattr(vehicle, "model", "Unknown")
+        },
+        "action": action
+    }
+    
+    # Process actions
+    if action == "status":
+        # Get comprehensive status
+        response["result"] = {
+            "doors_locked": vehicle.doors_windows.lock_state.value if hasattr(vehicle, "doors_windows") else None,
+            "mileage": {
+                "value": vehicle.mileage.value if hasattr(vehicle.mileage, "value") else vehicle.mileage,
+                "unit": vehicle.mileage.unit if hasattr(vehicle.mileage, "unit") else "km"
+            },
+            "fuel": {
+                "remaining_percent": vehicle.fuel_and_battery.remaining_fuel_percent if hasattr(vehicle, "fuel_and_battery") else None,
+                "remaining_range": vehicle.fuel_and_battery.remaining_range_total if hasattr(vehicle, "fuel_and_battery") else None
+            },
+            "location": {
+                "latitude": vehicle.location.location.latitude if hasattr(vehicle, "location") and vehicle.location and vehicle.location.location else None,
+                "longitude": vehicle.location.location.longitude if hasattr(vehicle, "location") and vehicle.location and vehicle.location.location else None
+            }
+        }
+        
+    elif action in _REMOTE_COMMANDS:
+        command, method_name, log_line, message = _REMOTE_COMMANDS[action]
+        print(log_line)
+        remote_services = RemoteServices(vehicle)
+        result = await getattr(remote_services, method_name)()
+        response["result"] = {
+            "command": command,
+            "status": "initiated",
+            "message": message
+        }
+        
+    elif action == "location":
+        location = vehicle.location
+        if location and location.location:
+            response["result"] = {
+                "latitude": location.location.latitude,
+                "longitude": location.location.longitude,
+                "heading": location.heading,
+                "timestamp": location.vehicle_update_timestamp.isoformat() if location.vehicle_update_timestamp else None
+            }
+        else:
+            response["result"] = {"error": "Location not available"}
+            
+    elif action == "fuel":
+        fuel = vehicle.fuel_and_battery
+        if fuel:
+            response["result"] = {
+                "remaining_fuel": fuel.remaining_fuel,
+                "remaining_fuel_percent": fuel.remaining_fuel_percent,
+                "remaining_range_fuel": fuel.remaining_range_fuel,
+                "remaining_range_electric": fuel.remaining_range_electric,
+                "remaining_range_total": fuel.remaining_range_total
+            }
+        else:
+            response["result"] = {"error": "Fuel data not available"}
+            
+    elif action == "mileage":
+        mileage = vehicle.mileage
+        response["result"] = {
+            "value": mileage.value if hasattr(mileage, "value") else mileage,
+            "unit": mileage.unit if hasattr(mileage, "unit") else "km"
+        }
+        
+    elif action == "lock_status":
+        lock_state = vehicle.doors_windows.lock_state if hasattr(vehicle, "doors_windows") else None
+        response["result"] = lock_state.value if lock_state and hasattr(lock_state, "value") else "Unknown"
+        
+    elif action == "is_locked":
+        lock_state = vehicle.doors_windows.lock_state if hasattr(vehicle, "doors_windows") else None
+        if lock_state and hasattr(lock_state, "value"):
+            if lock_state.value == "LOCKED":
+                response["result"] = "locked"
+            elif lock_state.value == "UNLOCKED":
+                response["result"] = "unlocked"
+            else:
+                response["result"] = f"Intermediate state: {lock_state.value}"
+        else:
+            response["result"] = "Unknown"
+            
+    elif action == "check_control":
+        report = vehicle.check_control_message_report
+        response["result"] = {
+            "has_check_control_messages": report.has_check_control_messages if report else False,
+            "messages": [msg.to_dict() for msg in report.messages] if report and report.messages else []
+        }
+        
+    else:
+        response["result"] = {"error": f"Unknown action: {action}"}
+    
+    return response, 200
+
 @functions_framework.http
 def bmw_api(request):
     """
@@ -17,16 +195,11 @@ def bmw_api(request):
     """
     # Handle CORS
     if request.method == "OPTIONS":
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, GET",
-            "Access-Control-Allow-Headers": "Content-Type",
-        }
-        return ("", 204, headers)
+        return _PREFLIGHT_RESPONSE
     
     # Health check endpoint
     if request.method == "GET" and request.path == "/health":
-        return jsonify({
+        return _json({
             "status": "healthy",
             "service": "bmw-api-stateless",
             "version": "1.0.0",
@@ -36,32 +209,29 @@ def bmw_api(request):
                 "oauth_storage": "disabled",
                 "hcaptcha_required": True
             }
-        }), 200, {"Access-Control-Allow-Origin": "*"}
+        })
     
     # Parse request
+    raw = request.get_data()
+    if not raw:
+        return _json({"error": "Request must be JSON"}, 400)
+    
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "Request must be JSON"}), 400
-            
-        # Required fields
-        email = data.get("email")
-        password = data.get("password")
-        wkn = data.get("wkn")
-        hcaptcha_token = data.get("hcaptcha")
-        
-        if not all([email, password, wkn, hcaptcha_token]):
-            return jsonify({
-                "error": "Missing required fields",
-                "required": ["email", "password", "wkn", "hcaptcha"],
-                "message": "hCaptcha token is required for every request in stateless mode"
-            }), 400
-            
-    except Exception as e:
-        return jsonify({"error": f"Invalid request: {str(e)}"}), 400
+        body = msgspec.json.decode(raw, type=BmwRequest)
+    except msgspec.ValidationError as e:
+        return _missing_fields(str(e))
+    except msgspec.DecodeError as e:
+        return _json({"error": f"Invalid request: {str(e)}"}, 400)
+    
+    # Required fields must also be non-empty
+    if not (body.email and body.password and body.wkn and body.hcaptcha):
+        return _missing_fields("Required fields must not be empty")
     
-    # Optional fields
-    action = data.get("action", "status")
+    email = body.email
+    password = body.password
+    wkn = body.wkn
+    hcaptcha_token = body.hcaptcha
+    action = body.action
     
     print(f"📋 Processing stateless BMW API request: action={action}, vehicle={wkn}")
     
@@ -70,149 +240,11 @@ def bmw_api(request):
         print(f"🔐 Fresh authentication for {email} with hCaptcha...")
         account = MyBMWAccount(email, password, Regions.REST_OF_WORLD, hcaptcha_token=hcaptcha_token)
         
-        # Get vehicles (this triggers authentication)
-        print("🚗 Fetching vehicles...")
-        asyncio.run(account.get_vehicles())
-        
-        # Find target vehicle
-        vehicle = account.get_vehicle(wkn)
-        if not vehicle:
-            return jsonify({
-                "error": f"Vehicle {wkn} not found",
-                "available_vehicles": [v.vin for v in account.vehicles]
-            }), 404
-        
-        # Build base response
-        response = {
-            "success": True,
-            "vehicle": {
-                "brand": vehicle.brand,
-                "name": vehicle.name,
-                "vin": vehicle.vin,
-                "model": getattr(vehicle, "model", "Unknown")
-            },
-            "action": action
-        }
-        
-        # Process actions
-        if action == "status":
-            # Get comprehensive status
-            response["result"] = {
-                "doors_locked": vehicle.doors_windows.lock_state.value if hasattr(vehicle, "doors_windows") else None,
-                "mileage": {
-                    "value": vehicle.mileage.value if hasattr(vehicle.mileage, "value") else vehicle.mileage,
-                    "unit": vehicle.mileage.unit if hasattr(vehicle.mileage, "unit") else "km"
-                },
-                "fuel": {
-                    "remaining_percent": vehicle.fuel_and_battery.remaining_fuel_percent if hasattr(vehicle, "fuel_and_battery") else None,
-                    "remaining_range": vehicle.fuel_and_battery.remaining_range_total if hasattr(vehicle, "fuel_and_battery") else None
-                },
-                "location": {
-                    "latitude": vehicle.location.location.latitude if hasattr(vehicle, "location") and vehicle.location and vehicle.location.location else None,
-                    "longitude": vehicle.location.location.longitude if hasattr(vehicle, "location") and vehicle.location and vehicle.location.location else None
-                }
-            }
-            
-        elif action == "lock":
-            print("🔒 Sending lock command...")
-            remote_services = RemoteServices(vehicle)
-            result = asyncio.run(remote_services.trigger_remote_door_lock())
-            response["result"] = {
-                "command": "lock",
-                "status": "initiated",
-                "message": "Lock command sent successfully"
-            }
-            
-        elif action == "unlock":
-            print("🔓 Sending unlock command...")
-            remote_services = RemoteServices(vehicle)
-            result = asyncio.run(remote_services.trigger_remote_door_unlock())
-            response["result"] = {
-                "command": "unlock",
-                "status": "initiated",
-                "message": "Unlock command sent successfully"
-            }
-            
-        elif action == "flash":
-            print("💡 Sending flash lights command...")
-            remote_services = RemoteServices(vehicle)
-            result = asyncio.run(remote_services.trigger_remote_light_flash())
-            response["result"] = {
-                "command": "flash",
-                "status": "initiated",
-                "message": "Flash lights command sent successfully"
-            }
-            
-        elif action == "climate" or action == "ac":
-            print("❄️ Sending climate control command...")
-            remote_services = RemoteServices(vehicle)
-            result = asyncio.run(remote_services.trigger_remote_air_conditioning())
-            response["result"] = {
-                "command": "climate",
-                "status": "initiated",
-                "message": "Climate control command sent successfully"
-            }
-            
-        elif action == "location":
-            location = vehicle.location
-            if location and location.location:
-                response["result"] = {
-                    "latitude": location.location.latitude,
-                    "longitude": location.location.longitude,
-                    "heading": location.heading,
-                    "timestamp": location.vehicle_update_timestamp.isoformat() if location.vehicle_update_timestamp else None
-                }
-            else:
-                response["result"] = {"error": "Location not available"}
-                
-        elif action == "fuel":
-            fuel = vehicle.fuel_and_battery
-            if fuel:
-                response["result"] = {
-                    "remaining_fuel": fuel.remaining_fuel,
-                    "remaining_fuel_percent": fuel.remaining_fuel_percent,
-                    "remaining_range_fuel": fuel.remaining_range_fuel,
-                    "remaining_range_electric": fuel.remaining_range_electric,
-                    "remaining_range_total": fuel.remaining_range_total
-                }
-            else:
-                response["result"] = {"error": "Fuel data not available"}
-                
-        elif action == "mileage":
-            mileage = vehicle.mileage
-            response["result"] = {
-                "value": mileage.value if hasattr(mileage, "value") else mileage,
-                "unit": mileage.unit if hasattr(mileage, "unit") else "km"
-            }
-            
-        elif action == "lock_status":
-            lock_state = vehicle.doors_windows.lock_state if hasattr(vehicle, "doors_windows") else None
-            response["result"] = lock_state.value if lock_state and hasattr(lock_state, "value") else "Unknown"
-            
-        elif action == "is_locked":
-            lock_state = vehicle.doors_windows.lock_state if hasattr(vehicle, "doors_windows") else None
-            if lock_state and hasattr(lock_state, "value"):
-                if lock_state.value == "LOCKED":
-                    response["result"] = "locked"
-                elif lock_state.value == "UNLOCKED":
-                    response["result"] = "unlocked"
-                else:
-                    response["result"] = f"Intermediate state: {lock_state.value}"
-            else:
-                response["result"] = "Unknown"
-                
-        elif action == "check_control":
-            report = vehicle.check_control_message_report
-            response["result"] = {
-                "has_check_control_messages": report.has_check_control_messages if report else False,
-                "messages": [msg.to_dict() for msg in report.messages] if report and report.messages else []
-            }
-            
-        else:
-            response["result"] = {"error": f"Unknown action: {action}"}
+        # Fetch vehicles and run the action in a single event loop
+        result, status_code = asyncio.run(_process(account, wkn, action))
         
-        # Return successful response
-        return jsonify(response), 200, {"Access-Control-Allow-Origin": "*"}
+        # Return response
+        return _json(result, status_code)
         
     except Exception as e:
         error_msg = str(e)
@@ -220,29 +252,29 @@ def bmw_api(request):
         
         # Determine error type and response
         if "unauthorized" in error_msg.lower() or "401" in error_msg:
-            return jsonify({
+            return _json({
                 "error": "Authentication failed",
                 "message": "Invalid credentials or hCaptcha token",
                 "hint": "Ensure hCaptcha token is valid and credentials are correct"
-            }), 401
+            }, 401)
         elif "429" in error_msg or "quota" in error_msg.lower():
-            return jsonify({
+            return _json({
                 "error": "Rate limited",
                 "message": "BMW API quota exceeded",
                 "hint": "Please try again later"
-            }), 429
+            }, 429)
         elif "hcaptcha" in error_msg.lower():
-            return jsonify({
+            return _json({
                 "error": "hCaptcha required",
                 "message": "Valid hCaptcha token is required for stateless authentication",
                 "hint": "Provide 'hcaptcha' field with valid token"
-            }), 400
+            }, 400)
         else:
-            return jsonify({
+            return _json({
                 "error": "Request failed",
                 "message": error_msg,
                 "service": "bmw-api-stateless"
-            }), 500
+            }, 500)
 
 if __name__ == "__main__":
     # Local testing
@@ -0,0 +1,10 @@
+"""
+BMW Connected Drive API Test Suite
+
+Test Structure:
+- unit/: Unit tests for the stateless Cloud Function (src/main_stateless.py)
+- conftest.py: Shared fixtures and test configuration
+
+Usage:
+    pytest tests/unit/
+"""
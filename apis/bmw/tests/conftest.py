@@ -0,0 +1,44 @@
+"""
+Test configuration and fixtures for BMW API tests
+"""
+import os
+import sys
+import pytest
+import orjson
+
+# main_stateless is deployed as a standalone Cloud Function module, not via the src package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+class StubRequest:
+    """Minimal stand-in for the Flask request the Cloud Function receives"""
+
+    def __init__(self, body=b"", method="POST", path="/"):
+        self.method = method
+        self.path = path
+        self._body = body
+
+    def get_data(self):
+        return self._body
+
+
+@pytest.fixture
+def make_request():
+    """Build a stub request from a dict (JSON-encoded), raw bytes, or nothing"""
+    def _make(body=None, method="POST", path="/"):
+        if isinstance(body, (dict, list)):
+            body = orjson.dumps(body)
+        return StubRequest(body or b"", method=method, path=path)
+    return _make
+
+
+@pytest.fixture
+def valid_body():
+    """A complete stateless request body"""
+    return {
+        "email": "test@example.com",
+        "password": "password123",
+        "wkn": "WBA12345678901234",
+        "hcaptcha": "P1_test_token",
+        "action": "status"
+    }
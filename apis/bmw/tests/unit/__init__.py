@@ -0,0 +1,5 @@
+"""
+Unit tests for the BMW stateless API.
+
+All unit tests use stubbed requests and mocks and don't make external API calls.
+"""
@@ -0,0 +1,128 @@
+"""
+Unit tests for request parsing and validation in the stateless BMW Cloud Function.
+
+Covers missing and empty fields, malformed JSON, the action field's type and
+the shape of every 400 response body. No request reaches BMW servers.
+"""
+
+import orjson
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import main_stateless
+from main_stateless import bmw_api
+
+
+def _decode(response):
+    """Split a (body, status, headers) response tuple and parse the body"""
+    body, status, headers = response
+    return orjson.loads(body), status, headers
+
+
+class TestMissingFields:
+    """Requests without every required stateless field are rejected with 400"""
+
+    @pytest.mark.parametrize("field", ["email", "password", "wkn", "hcaptcha"])
+    def test_missing_field(self, make_request, valid_body, field):
+        del valid_body[field]
+        data, status, headers = _decode(bmw_api(make_request(valid_body)))
+
+        assert status == 400
+        assert data["error"] == "Missing required fields"
+        assert data["required"] == ["email", "password", "wkn", "hcaptcha"]
+        assert field in data["details"]
+        assert data["message"] == "hCaptcha token is required for every request in stateless mode"
+        assert headers["Access-Control-Allow-Origin"] == "*"
+
+    @pytest.mark.parametrize("field", ["email", "password", "wkn", "hcaptcha"])
+    def test_empty_field(self, make_request, valid_body, field):
+        valid_body[field] = ""
+        data, status, _ = _decode(bmw_api(make_request(valid_body)))
+
+        assert status == 400
+        assert data["error"] == "Missing required fields"
+        assert data["details"] == "Required fields must not be empty"
+
+    def test_wrong_field_type(self, make_request, valid_body):
+        valid_body["email"] = 42
+        data, status, _ = _decode(bmw_api(make_request(valid_body)))
+
+        assert status == 400
+        assert data["error"] == "Missing required fields"
+        assert "email" in data["details"]
+
+
+class TestMalformedJson:
+    """Bodies that are not a JSON object are rejected before validation"""
+
+    def test_empty_body(self, make_request):
+        data, status, _ = _decode(bmw_api(make_request()))
+
+        assert status == 400
+        assert data == {"error": "Request must be JSON"}
+
+    @pytest.mark.parametrize("raw", [b"{", b"not json", b'{"email": "a",}'])
+    def test_invalid_json(self, make_request, raw):
+        data, status, _ = _decode(bmw_api(make_request(raw)))
+
+        assert status == 400
+        assert data["error"].startswith("Invalid request: ")
+
+    def test_non_object_body(self, make_request):
+        data, status, _ = _decode(bmw_api(make_request([1, 2, 3])))
+
+        assert status == 400
+        assert data["error"] == "Missing required fields"
+
+
+class TestActionField:
+    """action is a single action name and defaults to status"""
+
+    def test_action_list_rejected(self, make_request, valid_body):
+        valid_body["action"] = ["fuel", "location"]
+        data, status, _ = _decode(bmw_api(make_request(valid_body)))
+
+        assert status == 400
+        assert data["error"] == "Missing required fields"
+        assert "action" in data["details"]
+
+    def test_action_defaults_to_status(self, make_request, valid_body):
+        del valid_body["action"]
+        process = AsyncMock(return_value=({"success": True}, 200))
+        with patch.object(main_stateless, "MyBMWAccount", MagicMock()) as account_cls, \
+                patch.object(main_stateless, "_process", process):
+            data, status, _ = _decode(bmw_api(make_request(valid_body)))
+
+        assert status == 200
+        assert data == {"success": True}
+        account_cls.assert_called_once()
+        assert account_cls.call_args.kwargs["hcaptcha_token"] == "P1_test_token"
+        process.assert_awaited_once_with(account_cls.return_value, valid_body["wkn"], "status")
+
+    def test_action_passed_through(self, make_request, valid_body):
+        valid_body["action"] = "fuel"
+        process = AsyncMock(return_value=({"success": True}, 200))
+        with patch.object(main_stateless, "MyBMWAccount", MagicMock()), \
+                patch.object(main_stateless, "_process", process):
+            _, status, _ = _decode(bmw_api(make_request(valid_body)))
+
+        assert status == 200
+        assert process.await_args.args[2] == "fuel"
+
+
+class TestNonPostRequests:
+    """Preflight and health check bypass body parsing"""
+
+    def test_preflight(self, make_request):
+        body, status, headers = bmw_api(make_request(method="OPTIONS"))
+
+        assert status == 204
+        assert body == ""
+        assert headers["Access-Control-Allow-Methods"] == "POST, GET"
+
+    def test_health(self, make_request):
+        data, status, _ = _decode(bmw_api(make_request(method="GET", path="/health")))
+
+        assert status == 200
+        assert data["status"] == "healthy"
+        assert data["features"]["hcaptcha_required"] is True